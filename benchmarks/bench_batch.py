@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Compare the throughput of Group.set_many/Group.get_many with a loop of
+single Group.__setitem__/Group.__getitem__ calls, for many small objects
+spread over a few groups.
+
+Usage: python benchmarks/bench_batch.py [count]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import h5obj
+
+
+def entries(count):
+    """Return dict of "count" small objects of mixed types.
+    """
+    objects = {}
+    for i in range(count):
+        key = 'group%i/obj%i' % (i % 10, i)
+        objects[key] = (i, [i, i+1.5], {'i': i}, 'name%i' % i, None)[i % 5]
+    return objects
+
+
+def measure(count):
+    """Return dict of runtimes (seconds) of writing and reading "count"
+    entries, per key and batched.
+    """
+    objects = entries(count)
+    keys = list(objects)
+    times = {}
+    fd, filename = tempfile.mkstemp(suffix='.h5')
+    os.close(fd)
+    try:
+        with h5obj.File(filename, 'w') as f:
+            time0 = time.perf_counter()
+            for key, obj in objects.items():
+                parent = key.rsplit('/', 1)[0]
+                if parent not in f:
+                    f.create_group(parent)
+                f[key] = obj
+            times['setitem loop'] = time.perf_counter()-time0
+        with h5obj.File(filename, 'r') as f:
+            time0 = time.perf_counter()
+            for key in keys:
+                f[key]
+            times['getitem loop'] = time.perf_counter()-time0
+        with h5obj.File(filename, 'w') as f:
+            time0 = time.perf_counter()
+            f.set_many(objects)
+            times['set_many'] = time.perf_counter()-time0
+        with h5obj.File(filename, 'r') as f:
+            time0 = time.perf_counter()
+            f.get_many(keys)
+            times['get_many'] = time.perf_counter()-time0
+    finally:
+        os.remove(filename)
+    return times
+
+
+def main(count=10000):
+    times = measure(count)
+    for name, seconds in times.items():
+        print('%-14s %10.3f s %12.0f objects/s' % (name, seconds,
+                                                    count/seconds))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
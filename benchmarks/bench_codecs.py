@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Compare the registered h5obj codecs: encode time, decode time and size of
+the stored file, either on synthetic nested lists or on the objects of an
+existing h5obj file (all datasets, or only the given ones).
+
+Usage: python benchmarks/bench_codecs.py [filename [dsetname ...]]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import h5obj
+
+
+def synthetic():
+    """Return dict of synthetic objects, resembling large nested lists of
+    simulation results.
+    """
+    random.seed(42)
+    return dict(nested_floats=[[random.random() for j in range(100)]
+                               for i in range(2000)],
+                nested_ints=[[random.randint(0, 10**6) for j in range(50)]
+                             for i in range(2000)],
+                mixed=[dict(step=i, energy=random.random(), converged=i % 2,
+                            label='run%i' % i, params=(i, None, [1., 2.]))
+                       for i in range(5000)],
+                small=dict(name='config', tol=1e-8, steps=[10, 20], flag=None))
+
+
+def from_file(filename, dsetnames=None):
+    """Return dict of objects loaded from an existing h5obj file. Only
+    encoded objects (and lists/tuples) are considered.
+    """
+    objects = {}
+    with h5obj.File(filename, 'r') as f:
+        if not dsetnames:
+            dsetnames = []
+            f.visititems(lambda name, obj: dsetnames.append(name)
+                         if not hasattr(obj, 'keys') else None)
+        for dsetname in dsetnames:
+            obj = f[dsetname]
+            if h5obj.strategy(obj) in (h5obj.ENCODED, h5obj.LIST, h5obj.TUPLE):
+                objects[dsetname] = obj
+    return objects
+
+
+def best(func, repeat=3):
+    """Return best runtime of func in seconds.
+    """
+    times = []
+    for r in range(repeat):
+        time0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter()-time0)
+    return min(times)
+
+
+def filesize(codec, obj):
+    """Return size of a file containing only the given object.
+    """
+    fd, filename = tempfile.mkstemp(suffix='.h5')
+    os.close(fd)
+    try:
+        with h5obj.File(filename, 'w', codec=codec) as f:
+            f['obj'] = obj
+        return os.path.getsize(filename)
+    finally:
+        os.remove(filename)
+
+
+def main(filename=None, *dsetnames):
+    objects = from_file(filename, dsetnames) if filename else synthetic()
+    print('%-24s %-8s %12s %12s %12s' % ('object', 'codec', 'encode [ms]',
+                                         'decode [ms]', 'file [B]'))
+    for name, obj in objects.items():
+        for codecname in h5obj.codecs.available():
+            codec = h5obj.codecs.get(codecname)
+            try:
+                data = codec.encode(obj)
+            except (TypeError, ValueError) as exc:
+                print('%-24s %-8s %s' % (name, codecname, exc))
+                continue
+            tenc = best(lambda: codec.encode(obj))
+            tdec = best(lambda: codec.decode(data))
+            print('%-24s %-8s %12.3f %12.3f %12i'
+                  % (name[-24:], codecname, tenc*1e3, tdec*1e3,
+                     filesize(codec, obj)))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
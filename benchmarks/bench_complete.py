@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Measure the latency of h5complete on a file with many nodes: completing
+inside a large group without cache (first tab press), with the on-disk cache
+(repeated tab presses), and with the previous approach of listing the group
+through the structural index.
+
+Usage: python benchmarks/bench_complete.py [nodes]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import h5py
+import numpy
+
+tmpdir = tempfile.mkdtemp()
+os.environ['XDG_CACHE_HOME'] = os.path.join(tmpdir, 'cache')
+
+import h5obj
+from h5obj import tools
+
+
+def create(filename, nodes):
+    """Create a file with the given number of nodes: a group "big" holding
+    half of them (datasets), and groups of 100 datasets for the rest.
+    """
+    with h5py.File(filename, 'w') as f:
+        big = f.create_group('big')
+        for i in range(nodes//2):
+            big.create_dataset('dset%06i' % i, data=numpy.zeros(16))
+        for i in range(nodes//2//101):
+            group = f.create_group('group%04i' % i)
+            for j in range(100):
+                group.create_dataset('dset%03i' % j, data=numpy.zeros(16))
+
+
+def index_listing(incompl):
+    """Complete the way h5complete did before the on-disk cache.
+    """
+    filename, rest = tools.h5split(incompl)
+    grpname, prefix = rest.rsplit('/', 1)
+    with h5obj.File(filename, 'r', index=True) as f:
+        return [name for name, entry in f.index.items(grpname)
+                if name.startswith(prefix)]
+
+
+def timed(func, *args):
+    time0 = time.perf_counter()
+    func(*args)
+    return time.perf_counter()-time0
+
+
+def main(nodes=100000):
+    filename = os.path.join(tmpdir, 'nodes.h5')
+    try:
+        create(filename, nodes)
+        incompl = filename+'/big/dset0001'
+        times = {}
+        times['index listing'] = timed(index_listing, incompl)
+        times['uncached'] = timed(tools.h5complete, incompl)
+        times['cached'] = min(timed(tools.h5complete, incompl)
+                              for i in range(5))
+        times['cached, other group'] = timed(tools.h5complete,
+                                             filename+'/group0001/d')
+        for name, seconds in times.items():
+            print('%-20s %10.4f s' % (name, seconds))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
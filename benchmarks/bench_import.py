@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Measure the startup latency of the command line tools: the import time of
+h5obj.tools (using "python -X importtime" in a fresh interpreter), and the
+modules taking most of it. Exit with status 1 if the total import time
+exceeds the given limit (in milliseconds), so that this can be used as a
+regression check.
+
+Usage: python benchmarks/bench_import.py [limit_ms] [module]
+"""
+
+import subprocess
+import sys
+
+
+def importtime(module='h5obj.tools', repeat=5):
+    """Import the given module in fresh interpreters. Return the smallest
+    total import time (microseconds) and the self times (microseconds) of all
+    imported modules of that run.
+    """
+    best = None
+    for i in range(repeat):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                               'import '+module],
+                              stderr=subprocess.PIPE, text=True, check=True)
+        selftimes = {}
+        total = 0
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            selftime, cumulative, name = line[12:].split('|')
+            selftimes[name.strip()] = int(selftime)
+            if name.strip() == module:
+                total = int(cumulative)
+        if best is None or total < best[0]:
+            best = total, selftimes
+    return best
+
+
+def main(limit=None, module='h5obj.tools'):
+    total, selftimes = importtime(module)
+    print('import %s: %.1f ms' % (module, total/1000))
+    print('slowest modules (self time):')
+    for name in sorted(selftimes, key=selftimes.get, reverse=True)[:10]:
+        print('  %-30s %8.1f ms' % (name, selftimes[name]/1000))
+    for name in ('h5py', 'numpy', 'orjson', 'cofunc', 'columnize',
+                 'comliner'):
+        if name in selftimes:
+            print('warning: %s is imported eagerly' % name)
+    if limit is not None and total/1000 > limit:
+        print('import time exceeds limit of %.1f ms' % limit)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    limit = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    sys.exit(main(limit, *sys.argv[2:3]))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Compare the single-pass, type-dispatched h5obj.Group.__setitem__ with the
+previous implementation (write natively, read back, compare types, delete and
+rewrite as json).
+
+Usage: python benchmarks/bench_setitem.py [repeat]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import h5py
+import numpy
+
+import h5obj
+
+
+def legacy_setitem(h5group, key, obj):
+    """The write path of h5obj.Group.__setitem__ up to version 0.1.0.
+    """
+    try:
+        h5group.create_dataset(key, data=obj)
+    except (ValueError, TypeError):
+        h5group.create_dataset(key, data=json.dumps(obj))
+    else:
+        if type(h5group[key][()]) is not type(obj):
+            del h5group[key]
+            h5group.create_dataset(key, data=json.dumps(obj))
+
+
+def workloads():
+    """Return dict of named objects to be written.
+    """
+    return dict(list=list(range(100000)),
+                tuple=tuple(float(i) for i in range(100000)),
+                dict={str(i): [i, i/2.] for i in range(10000)},
+                none=None,
+                ndarray=numpy.random.random((1000, 1000)))
+
+
+def measure(setitem, obj, count, repeat):
+    """Write obj count times into a fresh file, repeat times. Return best time
+    per write in seconds and the resulting file size in bytes.
+    """
+    best = float('inf')
+    size = 0
+    for r in range(repeat):
+        fd, filename = tempfile.mkstemp(suffix='.h5')
+        os.close(fd)
+        try:
+            with h5py.File(filename, 'w') as f:
+                time0 = time.perf_counter()
+                for i in range(count):
+                    setitem(f, 'obj%i' % i, obj)
+                best = min(best, (time.perf_counter()-time0)/count)
+            size = os.path.getsize(filename)
+        finally:
+            os.remove(filename)
+    return best, size
+
+
+def main(repeat=3):
+    print('%-8s %12s %12s %8s %12s %12s' % ('type', 'legacy [ms]', 'h5obj [ms]',
+                                             'speedup', 'legacy [B]',
+                                             'h5obj [B]'))
+    for name, obj in workloads().items():
+        count = 1 if name == 'ndarray' else 10
+        if name == 'none':
+            count = 1000
+        told, sold = measure(legacy_setitem, obj, count, repeat)
+        tnew, snew = measure(lambda f, k, o: h5obj.Group(f).__setitem__(k, o),
+                             obj, count, repeat)
+        print('%-8s %12.3f %12.3f %7.1fx %12i %12i'
+              % (name, told*1e3, tnew*1e3, told/tnew, sold, snew))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Benchmark suite for h5obj core and tools. Generates synthetic files in a
+temporary directory and measures:
+
+- throughput of Group.__setitem__ and Group.__getitem__ for different value
+  types (scalars, None, strings, nested lists, tuples, dicts, small and large
+  arrays) and sizes
+- file size per object for each codec
+- end-to-end latency of the tools h5load, h5save, h5ls, h5glob, h5cp and
+  h5complete on a deep and a wide tree
+
+Results are written as JSON (including the git commit of the working tree),
+so that runs can be compared between commits.
+
+Usage: python benchmarks/suite.py [--quick] [--output FILE]
+       python benchmarks/suite.py --compare OLD.json NEW.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import h5py
+import numpy
+
+import h5obj
+from h5obj import codecs, tools
+
+
+def values(size):
+    """Return dict of sample values of the given size (number of elements of
+    the containers).
+    """
+    return {
+        'int': 42,
+        'float': 3.14,
+        'none': None,
+        'str': 'x'*size,
+        'list': list(range(size)),
+        'nested list': [[i, str(i), [i*0.5]] for i in range(size)],
+        'tuple': tuple(float(i) for i in range(size)),
+        'dict': {'key%i' % i: [i, {'v': i*0.5}] for i in range(size)},
+        'small ndarray': numpy.arange(size, dtype=float),
+        'large ndarray': numpy.arange(size*10000, dtype=float),
+    }
+
+
+def timed(func, *args, repeat=5, **kwargs):
+    """Call the given function repeatedly. Return dict with minimum and
+    median runtime (seconds).
+    """
+    times = []
+    for i in range(repeat):
+        time0 = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter()-time0)
+    return dict(min=min(times), median=statistics.median(times))
+
+
+def bench_throughput(tmpdir, sizes, count):
+    """Measure writes and reads of "count" objects per value type and size,
+    using files in the given directory. Return dict of results (objects per
+    second).
+    """
+    results = {}
+    filename = os.path.join(tmpdir, 'throughput.h5')
+    for size in sizes:
+        for name, value in values(size).items():
+            n = max(1, count//100) if name == 'large ndarray' else count
+            keys = ['obj%i' % i for i in range(n)]
+            with h5obj.File(filename, 'w') as f:
+                time0 = time.perf_counter()
+                for key in keys:
+                    f[key] = value
+                write = time.perf_counter()-time0
+            with h5obj.File(filename, 'r') as f:
+                time0 = time.perf_counter()
+                for key in keys:
+                    f[key]
+                read = time.perf_counter()-time0
+            results['%s/%i' % (name, size)] = dict(
+                count=n, setitem_per_s=n/write, getitem_per_s=n/read)
+    return results
+
+
+def bench_filesize(tmpdir, size, count):
+    """Measure the file size per object for each codec and value type, using
+    files in the given directory. Return dict of results (bytes per object).
+    """
+    results = {}
+    filename = os.path.join(tmpdir, 'filesize.h5')
+    for codec in codecs.available():
+        with h5obj.File(filename, 'w', codec=codec):
+            pass
+        empty = os.path.getsize(filename)
+        for name, value in values(size).items():
+            if name == 'large ndarray':
+                continue
+            with h5obj.File(filename, 'w', codec=codec) as f:
+                f.set_many({'obj%i' % i: value for i in range(count)})
+            results['%s/%s' % (codec, name)] = \
+                (os.path.getsize(filename)-empty)/count
+    return results
+
+
+def create_trees(tmpdir, depth, width):
+    """Create a deep tree (binary tree of the given depth, a small dataset in
+    each leaf group) and a wide tree (one group of "width" datasets) in the
+    given directory. Return the file names.
+    """
+    deep = os.path.join(tmpdir, 'deep.h5')
+    with h5py.File(deep, 'w') as f:
+        paths = ['']
+        for level in range(depth):
+            paths = [path+'/g%i' % i for path in paths for i in range(2)]
+        for path in paths:
+            f[path+'/data'] = numpy.arange(10.)
+    wide = os.path.join(tmpdir, 'wide.h5')
+    with h5obj.File(wide, 'w') as f:
+        f.set_many({'group/obj%06i' % i: [i, 'value'] for i in range(width)})
+    return deep, wide
+
+
+def bench_tools(tmpdir, depth, width, repeat):
+    """Measure the latency of the tools on a deep and a wide tree, using files
+    in the given directory. Return dict of results (seconds).
+    """
+    deep, wide = create_trees(tmpdir, depth, width)
+    leaf = '/'.join(['g1']*depth)
+    copy = os.path.join(tmpdir, 'copy.h5')
+    cases = {
+        'h5load deep': (tools.h5load, (deep+'/'+leaf+'/data',), {}),
+        'h5load wide': (tools.h5load, (wide+'/group/obj000001',), {}),
+        'h5save wide': (tools.h5save, (wide+'/group/new',),
+                        dict(data=[1, 2, 3], force=True)),
+        'h5ls wide': (tools.h5ls, (wide+'/group',), {}),
+        'h5glob deep': (tools.h5glob, (deep+'/**/data',), {}),
+        'h5glob wide': (tools.h5glob, (wide+'/group/obj00001*',), {}),
+        'h5cp deep': (tools.h5cp, (deep+'/g0', copy+'/g0'),
+                      dict(force=True, recursive=True)),
+        'h5cp wide': (tools.h5cp, (wide+'/group', copy+'/group'),
+                      dict(force=True, recursive=True)),
+        'h5complete deep': (tools.h5complete, (deep+'/'+leaf+'/d',), {}),
+        'h5complete wide': (tools.h5complete, (wide+'/group/obj0001',), {}),
+    }
+    results = {}
+    with open(os.devnull, 'w') as devnull:
+        for name, (func, args, kwargs) in cases.items():
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                results[name] = timed(func, *args, repeat=repeat, **kwargs)
+            finally:
+                sys.stdout = stdout
+    return results
+
+
+def commit():
+    """Return the git commit of the working tree (with suffix "+dirty" if
+    there are uncommitted changes), or None.
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        rev = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=cwd,
+                             capture_output=True, text=True, check=True)
+        status = subprocess.run(['git', 'status', '--porcelain', '-uno'],
+                                cwd=cwd, capture_output=True, text=True,
+                                check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return rev.stdout.strip()+('+dirty' if status.stdout.strip() else '')
+
+
+def run(tmpdir, quick=False):
+    """Run the whole suite, using files in the given directory. Return dict
+    of results.
+    """
+    if quick:
+        sizes, count, depth, width, repeat = [10], 100, 6, 1000, 3
+    else:
+        sizes, count, depth, width, repeat = [10, 1000], 1000, 10, 20000, 5
+    return dict(
+        commit=commit(),
+        date=datetime.datetime.now().isoformat(timespec='seconds'),
+        python=platform.python_version(),
+        h5py=h5py.__version__,
+        hdf5=h5py.version.hdf5_version,
+        numpy=numpy.__version__,
+        quick=quick,
+        throughput=bench_throughput(tmpdir, sizes, count),
+        filesize=bench_filesize(tmpdir, sizes[0], count),
+        tools=bench_tools(tmpdir, depth, width, repeat),
+    )
+
+
+def report(results):
+    print('commit %s (%s)' % (results['commit'], results['date']))
+    print('\nthroughput (objects/s)       setitem      getitem')
+    for name, result in results['throughput'].items():
+        print('  %-24s %12.0f %12.0f' % (name, result['setitem_per_s'],
+                                         result['getitem_per_s']))
+    print('\nfile size (bytes/object)')
+    for name, size in results['filesize'].items():
+        print('  %-32s %10.1f' % (name, size))
+    print('\ntools (seconds)                  min       median')
+    for name, result in results['tools'].items():
+        print('  %-24s %12.4f %12.4f' % (name, result['min'],
+                                         result['median']))
+
+
+def compare(old, new):
+    """Print the ratios of the results of two runs (new/old) that have both
+    been saved as JSON.
+    """
+    print('comparing %s (old) with %s (new)' % (old['commit'], new['commit']))
+    print('\nthroughput (new/old)         setitem      getitem')
+    for name, result in new['throughput'].items():
+        if name in old['throughput']:
+            before = old['throughput'][name]
+            print('  %-24s %11.2fx %11.2fx'
+                  % (name, result['setitem_per_s']/before['setitem_per_s'],
+                     result['getitem_per_s']/before['getitem_per_s']))
+    print('\nfile size (new/old)')
+    for name, size in new['filesize'].items():
+        if name in old['filesize'] and old['filesize'][name]:
+            print('  %-32s %10.2fx' % (name, size/old['filesize'][name]))
+    print('\ntools, min runtime (new/old)')
+    for name, result in new['tools'].items():
+        if name in old['tools']:
+            print('  %-24s %11.2fx'
+                  % (name, result['min']/old['tools'][name]['min']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller workloads, fewer repetitions')
+    parser.add_argument('--output', help='JSON file to write the results to '
+                        '(default: benchmarks/results/COMMIT.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare the results of two runs')
+    args = parser.parse_args()
+    if args.compare:
+        with open(args.compare[0]) as fh1, open(args.compare[1]) as fh2:
+            compare(json.load(fh1), json.load(fh2))
+        return
+    tmpdir = tempfile.mkdtemp(prefix='h5obj-bench-')
+    # keep the listings cached by h5complete away from the user's cache
+    cachehome = os.environ.get('XDG_CACHE_HOME')
+    os.environ['XDG_CACHE_HOME'] = os.path.join(tmpdir, 'cache')
+    try:
+        results = run(tmpdir, quick=args.quick)
+    finally:
+        if cachehome is None:
+            del os.environ['XDG_CACHE_HOME']
+        else:
+            os.environ['XDG_CACHE_HOME'] = cachehome
+        shutil.rmtree(tmpdir)
+    report(results)
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results',
+        '%s.json' % (results['commit'] or 'unknown'))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as fh:
+        json.dump(results, fh, indent=2)
+    print('\nresults written to %s' % output)
+
+
+if __name__ == '__main__':
+    main()
@@ -25,13 +25,19 @@
 adds to it the ability to store native Python types (including nested and
 empty lists and tuples, the None type, etc.) using string representations in
 json format. It uses the json module for objects which would not preserve
-their respective type when saved to HDF5, and when loading strings, it
-tries to decode it before interpreting it as a usual string.
+their respective type when saved to HDF5. Every dataset written by h5obj
+carries a small type tag (attribute "h5obj_type"), so that loading dispatches
+directly on the way the object was stored. Datasets without a tag (e.g.
+written by older versions) are decoded as json if possible, otherwise they are
+interpreted as a usual value.
 
 h5obj makes sure that you get back exactly the datatype that you were saving
 to the HDF5 file. This is to prevent the behavior of h5py.File, which for
 example returns a numpy.ndarray when storing a tuple or a list.
 
+Instead of json, other codecs can be selected per file (see h5obj.codecs),
+e.g. a faster json backend or a compact binary format.
+
 If in certain situations, the attempt to encode/decode the data is not
 intended, it can be switched off using the attributes "encode" and "decode" of
 the classes "Group" and "File".
@@ -43,91 +49,898 @@ __version__ = '0.1.0'
 
 import collections.abc
 import json
-import h5py
+import posixpath
+
+from h5obj import lazyimport
+h5py = lazyimport.module('h5py')
+numpy = lazyimport.module('numpy')
+
+from h5obj import cache as _cache
+from h5obj import codecs
+from h5obj import copying as _copying
+from h5obj import dedup as _dedup
+from h5obj import index as _index
+from h5obj import policy as _policy
+from h5obj import stats as _stats
+from h5obj import transaction as _transaction
+from h5obj.tags import TAG_ATTR, NATIVE, NDARRAY, LIST, TUPLE, ENCODED, JSON, \
+    SERIES, SERIES_PREFIX, DICT, read_tag, write_tag
+
+
+# root attribute of a file, recording the codec selected for it
+CODEC_ATTR = 'h5obj_codec'
+
+_INT64_MIN, _INT64_MAX = -2**63, 2**63-1
+
+
+def strategy(obj):
+    """Return the storage strategy for the given object, based only on its
+    type: NATIVE for types that h5py gives back unchanged (bytes and numpy
+    scalars), NDARRAY for numpy arrays (and memory maps) with an HDF5
+    equivalent, LIST or TUPLE for non-empty homogeneous sequences of bool,
+    int, float or complex (stored as array), and ENCODED for everything else
+    (including Python int, float, str, None, nested lists and dicts, which
+    h5py would return as a different type), which has to be encoded by a
+    codec.
+    """
+    otype = type(obj)
+    if otype is bytes:
+        return NATIVE
+    if otype is numpy.ndarray or otype is numpy.memmap:
+        if obj.ndim > 0 and obj.dtype.kind not in 'OUmM':
+            return NDARRAY
+        return ENCODED
+    if otype is list or otype is tuple:
+        if _homogeneous(obj):
+            return LIST if otype is list else TUPLE
+        return ENCODED
+    if isinstance(obj, numpy.generic) and not isinstance(obj, str):
+        return NATIVE
+    return ENCODED
+
+
+def _homogeneous(seq):
+    """Check if the sequence is non-empty and all its items are of the same
+    type (bool, int, float or complex), so that it survives a round trip
+    through a numpy array.
+    """
+    if not seq:
+        return False
+    itype = type(seq[0])
+    if itype not in (bool, int, float, complex):
+        return False
+    for item in seq:
+        if type(item) is not itype:
+            return False
+    if itype is int:
+        return min(seq) >= _INT64_MIN and max(seq) <= _INT64_MAX
+    return True
+
+
+def decode(dset, codec=None):
+    """Read the value of the given h5py.Dataset, dispatching on its type tag.
+    Encoded datasets are decoded with the given codec if it handles their tag,
+    otherwise with a registered codec that does. Datasets without a tag
+    (written by h5obj 0.1.0 or by other means) are decoded as json if
+    possible, otherwise the raw value is returned.
+    """
+    return _decode(dset, codec)[0]
+
+
+def _decode(dset, codec=None):
+    """Like decode(), but return the value together with the number of bytes
+    read (used as size estimate of the value).
+    """
+    return _decode_raw(read_tag(dset), dset[()], codec)
+
+
+def _decode_raw(tag, value, codec=None):
+    """Decode the raw value read from a dataset with the given type tag.
+    Return the value together with the number of bytes read.
+    """
+    if tag is None:
+        size = _nbytes(value)
+        try:
+            return json.loads(value), size
+        except (TypeError, ValueError):
+            return value, size
+    if tag == NATIVE or tag == NDARRAY:
+        return value, _nbytes(value)
+    if tag == LIST or tag == TUPLE:
+        size = value.nbytes
+        value = value.tolist()
+        return (value if tag == LIST else tuple(value)), size
+    if tag == SERIES:
+        return value, _nbytes(value)
+    if tag.startswith(SERIES_PREFIX):
+        codec = _series_codec(tag, codec)
+        if codec is None:
+            return value, _nbytes(value)
+        return _decode_records(value, codec)
+    if codec is None or codec.tag != tag:
+        codec = codecs.for_tag(tag)
+        if codec is None:
+            return value, _nbytes(value)
+    if isinstance(value, numpy.ndarray):
+        value = value.tobytes()
+    return codec.decode(value), len(value)
+
+
+def _series_codec(tag, codec=None):
+    """Return the codec to decode the records of a series of encoded objects
+    with the given type tag (preferably the given codec), or None.
+    """
+    tag = tag[len(SERIES_PREFIX):]
+    if codec is not None and codec.tag == tag:
+        return codec
+    return codecs.for_tag(tag)
+
+
+def _decode_records(payloads, codec):
+    """Decode the payloads of the records of a series of encoded objects.
+    Return list of the objects together with the number of bytes read.
+    """
+    objs = []
+    size = 0
+    for data in payloads:
+        if isinstance(data, numpy.ndarray):
+            data = data.tobytes()
+        size += len(data)
+        objs.append(codec.decode(data))
+    return objs, size
+
+
+def _tree_keys(obj):
+    """Check if all keys of the given dictionary can be used as names of
+    group members.
+    """
+    for key in obj:
+        if type(key) is not str or not key or '/' in key or key == '.':
+            return False
+    return True
+
+
+def _is_tree(h5group):
+    """Check if the given h5py.Group holds a dictionary stored as tree.
+    """
+    return bool(h5py.h5a.get_num_attrs(h5group.id)) \
+        and read_tag(h5group) == DICT
+
+
+def _numeric_records(objs):
+    """Return the given records as numpy array if they are numbers or numeric
+    numpy arrays of the same shape, otherwise None.
+    """
+    first = objs[0]
+    if type(first) not in (bool, int, float, complex) \
+            and not isinstance(first, (numpy.generic, numpy.ndarray)):
+        return None
+    try:
+        data = numpy.asarray(objs)
+    except (ValueError, OverflowError):
+        return None
+    return data if data.dtype.kind in 'biufc' else None
+
+
+def _payload_dtype(codec):
+    """Return the HDF5 variable-length type of the records of a series of
+    objects encoded by the given codec (text payloads are stored as strings,
+    binary payloads as byte arrays, which may contain null bytes).
+    """
+    if codec.binary:
+        return h5py.vlen_dtype(numpy.uint8)
+    return h5py.string_dtype()
+
+
+def _encode_records(objs, codec):
+    """Encode the given objects with the given codec. Return object array of
+    the payloads, to be written to a series.
+    """
+    payloads = numpy.empty(len(objs), dtype=object)
+    for i, obj in enumerate(objs):
+        data = codec.encode(obj)
+        if codec.binary:
+            data = numpy.frombuffer(data, dtype=numpy.uint8)
+        elif isinstance(data, bytes):
+            data = data.decode('utf-8')
+        payloads[i] = data
+    return payloads
+
+
+def _nbytes(value):
+    """Return the size of a raw value read from a dataset in bytes.
+    """
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    return getattr(value, 'nbytes', 0)
+
+
+def _read_raw(dsid):
+    """Read the raw value of a dataset using the low-level API, which is
+    considerably faster than "dset[()]" for small datasets. Only scalar
+    datasets and arrays of plain numbers are supported, return None for all
+    others.
+    """
+    space = dsid.get_space()
+    stype = space.get_simple_extent_type()
+    if stype == h5py.h5s.SCALAR:
+        buf = numpy.empty((), dtype=dsid.dtype)
+    elif stype == h5py.h5s.SIMPLE and dsid.dtype.kind in 'biufc':
+        buf = numpy.empty(space.shape, dtype=dsid.dtype)
+    else:
+        return None
+    dsid.read(h5py.h5s.ALL, h5py.h5s.ALL, buf)
+    return buf[()] if stype == h5py.h5s.SCALAR else buf
+
+
+def payload(dset):
+    """Return the payload of an encoded dataset, stored either as string or as
+    byte array.
+    """
+    value = dset[()]
+    if isinstance(value, numpy.ndarray):
+        return value.tobytes()
+    return value
+
+
+class LazyDataset(object):
+    """Lazy proxy for an h5py.Dataset, returned by Group.__getitem__ if
+    "return_value" is set to "lazy". Supports "shape", "dtype", "len()" and
+    numpy-style slicing, and only reads and decodes what gets indexed (use
+    "proxy[()]" to get the whole value). Encoded datasets (e.g. json) cannot
+    be sliced on disk, so they are decoded completely on first access.
+
+    Contiguous, uncompressed numeric datasets of files opened read-only are
+    accessed through a read-only numpy.memmap on the file offset of the
+    dataset, so slicing them is zero-copy.
+    """
+    def __init__(self, dset, decode=True, codec=None):
+        self.dset = dset
+        self.codec = codec
+        tag = read_tag(dset) if decode else NATIVE
+        if tag is None and dset.dtype.kind in 'OSU':
+            tag = JSON  # legacy heuristic, see decode()
+        self.tag = tag
+        self.encoded = tag not in (NATIVE, NDARRAY, LIST, TUPLE, SERIES,
+                                   None) and not tag.startswith(SERIES_PREFIX)
+        self._source = None
+        self._value = None
+        self._decoded = False
+
+    @property
+    def shape(self):
+        return self.dset.shape
+
+    @property
+    def dtype(self):
+        return self.dset.dtype
+
+    @property
+    def ndim(self):
+        return self.dset.ndim
+
+    @property
+    def size(self):
+        return self.dset.size
+
+    @property
+    def attrs(self):
+        return self.dset.attrs
+
+    @property
+    def name(self):
+        return self.dset.name
+
+    def __len__(self):
+        if self.encoded:
+            return len(self[()])
+        return self.dset.len()
+
+    def __getitem__(self, index):
+        if self.encoded:
+            if not self._decoded:
+                self._value = decode(self.dset, self.codec)
+                self._decoded = True
+            if isinstance(index, tuple) and not index:
+                return self._value
+            return self._value[index]
+        value = self.source()[index]
+        if isinstance(value, numpy.memmap):
+            value = value.view(numpy.ndarray)  # still zero-copy
+        if self.tag is not None and self.tag.startswith(SERIES_PREFIX):
+            codec = _series_codec(self.tag, self.codec)
+            if codec is None:
+                return value
+            if not isinstance(value, numpy.ndarray) \
+                    or value.dtype.kind != 'O':
+                return _decode_records([value], codec)[0][0]
+            return _decode_records(value, codec)[0]
+        if self.tag == LIST or self.tag == TUPLE:
+            if not isinstance(value, numpy.ndarray):
+                return value.item()
+            value = value.tolist()
+            return tuple(value) if self.tag == TUPLE else value
+        return value
+
+    def __array__(self, dtype=None, copy=None):
+        if self.encoded or (self.tag is not None
+                            and self.tag.startswith(SERIES_PREFIX)):
+            return numpy.asarray(self[()], dtype=dtype)
+        return numpy.asarray(self.source()[()], dtype=dtype)
+
+    def source(self):
+        """Return the object that is sliced: a read-only numpy.memmap if the
+        dataset allows zero-copy access, otherwise the h5py.Dataset itself.
+        """
+        if self._source is None:
+            self._source = self._memmap()
+            if self._source is None:
+                self._source = self.dset
+        return self._source
+
+    def _memmap(self):
+        dset = self.dset
+        if dset.file.mode != 'r' or dset.file.driver not in ('sec2', 'stdio'):
+            return None
+        if dset.chunks is not None or dset.external or not dset.shape \
+                or not dset.size:
+            return None
+        if dset.dtype.kind not in 'biufc':
+            return None
+        offset = dset.id.get_offset()
+        if offset is None:
+            return None
+        return numpy.memmap(dset.file.filename, mode='r', dtype=dset.dtype,
+                            shape=dset.shape, offset=offset)
+
+    def __repr__(self):
+        return '<h5obj lazy dataset %s (%s)>' % (self.dset.name, self.tag)
+
+
+_MISSING = object()
+_MOVING = '.h5obj-moving'  # temporary link name used by Group._replace()
 
 
 class Group(collections.abc.MutableMapping):
     """Wrapper for h5py.Group, using json format for native Python objects so
     those objects can later be retrieved from HDF5 files with their original
     type.
+
+    If "return_value" is True, items are read and decoded completely, if it is
+    False, the raw h5py.Dataset is returned, and if it is "lazy", a
+    LazyDataset proxy is returned that only reads what gets indexed.
+
+    "codec" selects the codec (name or h5obj.codecs.Codec instance) used to
+    encode objects without native HDF5 equivalent (see h5obj.codecs).
+    "policy" is an h5obj.policy.StoragePolicy, deciding about chunking and
+    compression of new datasets (True selects the default policy, None
+    disables chunking and compression).
+
+    "cache" is an h5obj.cache.ValueCache of decoded values, shared by all
+    groups of a file (True selects a cache with default limits, None disables
+    caching). It is invalidated by writing, deleting and copying through the
+    same file handle.
+
+    "index" is an h5obj.index.Index of the file, shared by all groups of a
+    file (True creates one). If given, it answers kind(), "in", len() and
+    iteration from metadata only, and is refreshed by writing, deleting and
+    copying through the same file handle.
+
+    "stats" is an h5obj.stats.Stats object, shared by all groups of a file
+    (True creates one), collecting operation counts, bytes and timings of
+    reads and writes (see h5obj.stats). None disables statistics.
+
+    If "refresh" is True, datasets are refreshed before they are read, so
+    that records appended by a writer in SWMR mode become visible (see
+    append()). It is set automatically for files opened with "swmr=True".
+
+    If "tree" is True, dictionaries with string keys are stored as groups
+    (tagged "dict") with one member per key, instead of being encoded as a
+    whole. Reading such a group returns the dictionary (regardless of this
+    option), but single members can be read by path (e.g. "config/solver/tol")
+    without touching the rest, and assigning to an existing member replaces
+    only that member.
+
+    If "dedup" is True, values that are already stored in the file (large
+    ones) are not written again but hard-linked (see h5obj.dedup), and
+    copying datasets within the file creates hard links as well.
     """
-    def __init__(self, h5group, encode=True, decode=True, return_value=True):
+    def __init__(self, h5group, encode=True, decode=True, return_value=True,
+                 codec=codecs.DEFAULT, policy=None, cache=None, index=None,
+                 stats=None, refresh=False, tree=False, dedup=False):
         self.h5group = h5group
         self.encode = encode
         self.decode = decode
         self.return_value = return_value
+        self.codec = codecs.get(codec)
+        self.policy = _policy.StoragePolicy() if policy is True else policy
+        self.cache = _cache.ValueCache() if cache is True else cache
+        self.index = _index.Index(h5group.file) if index is True else index
+        self.stats = _stats.Stats() if stats is True else stats
+        self.refresh = refresh
+        self.tree = tree
+        self.dedup = dedup
 
     def create_group(self, name):
-        return Group(self.h5group.create_group(name))
+        h5group = self.h5group.create_group(name)
+        if self.index is not None:
+            self.index.refresh(h5group.name)
+        return self._wrap(h5group)
 
     def require_group(self, name):
-        return Group(self.h5group.require_group(name))
+        h5group = self.h5group.require_group(name)
+        if self.index is not None:
+            self.index.refresh(h5group.name)
+        return self._wrap(h5group)
+
+    def _wrap(self, h5group):
+        """Wrap a child h5py.Group, passing on the settings of this group.
+        """
+        return Group(h5group, encode=self.encode, decode=self.decode,
+                     return_value=self.return_value, codec=self.codec,
+                     policy=self.policy, cache=self.cache, index=self.index,
+                     stats=self.stats, refresh=self.refresh, tree=self.tree,
+                     dedup=self.dedup)
+
+    def _path(self, key):
+        """Return absolute path of the given key (relative to this group).
+        """
+        return posixpath.normpath(posixpath.join(self.h5group.name, key))
+
+    def _changed(self, path):
+        """Invalidate the cache and refresh the index for the given absolute
+        path, which has been (or is about to be) created or overwritten.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(path)
+        if self.index is not None:
+            self.index.refresh(path)
+
+    def _removed(self, path):
+        """Invalidate the cache and the index for the given absolute path,
+        which has been removed.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(path)
+        if self.index is not None:
+            self.index.remove(path)
+
+    def kind(self, name):
+        """Return the kind of the object with the given name ("group" or
+        "dataset"), or None if it does not exist. Never reads any data.
+        """
+        if self.index is not None:
+            return self.index.kind(self._path(name))
+        cls = self.h5group.get(name, getclass=True)
+        if cls is None:
+            return None
+        return _index.GROUP if issubclass(cls, h5py.Group) else _index.DATASET
 
     def create_dataset(self, name, shape=None, dtype=None, data=None,
                        **kwargs):
-        return self.h5group.create_dataset(name, shape=None, dtype=None,
-                                           data=None, **kwargs)
+        dset = self.h5group.create_dataset(name, shape=shape, dtype=dtype,
+                                           data=data, **kwargs)
+        self._changed(dset.name)
+        return dset
 
     def require_dataset(self, name, shape, dtype, exact=False, **kwargs):
-        return self.h5group.require_dataset(name, shape, dtype, exact=exact,
+        dset = self.h5group.require_dataset(name, shape, dtype, exact=exact,
                                             **kwargs)
+        self._changed(dset.name)
+        return dset
 
     def __getitem__(self, key):
-        if not key in self.h5group:
-            return self.h5group[key]  # let h5py raise its own exception
-        if isinstance(self.h5group[key], h5py.Group):
-            return Group(self.h5group[key])
-        else:
-            dset = self.h5group[key]
-            if self.return_value:
-                if self.decode:# and isinstance(dset[()], str): #dset.value
-                    try:
-                        return json.loads(dset[()])
-                    except:
-                        return dset[()]
+        path = None
+        if self.cache is not None and self.return_value is True \
+                and self.decode:
+            path = self._path(key)
+            value = self.cache.get(path, _MISSING)
+            if value is not _MISSING:
+                return value
+        # let h5py raise its own exception
+        return self._value(self.h5group[key], path)
+
+    def _value(self, obj, path=None):
+        """Return the h5obj representation of the given h5py object, according
+        to the settings of this group. "path" is the absolute path of the
+        object (only used as key of the cache).
+        """
+        if isinstance(obj, h5py.Group):
+            if self.return_value is True and self.decode and _is_tree(obj):
+                value, size = self._read_tree(obj)
+                if self.cache is not None:
+                    self.cache.put(path or obj.name, value, size)
+                return value
+            return self._wrap(obj)
+        if self.refresh:
+            obj.refresh()
+        if not self.return_value:
+            return obj
+        if self.return_value == 'lazy':
+            return LazyDataset(obj, decode=self.decode, codec=self.codec)
+        if not self.decode:
+            return obj[()]
+        value, size = self._decode(obj)
+        if self.cache is not None:
+            self.cache.put(path or obj.name, value, size)
+        return value
+
+    def _read_tree(self, h5group):
+        """Read a dictionary stored as tree (see option "tree"). Return the
+        dictionary together with the number of bytes read.
+        """
+        obj = {}
+        size = 0
+        for name in h5group.id:
+            oid = h5py.h5o.open(h5group.id, name)
+            if isinstance(oid, h5py.h5g.GroupID):
+                child = h5py.Group(oid)
+                if _is_tree(child):
+                    value, nbytes = self._read_tree(child)
                 else:
-                    return dset[()]
+                    value, nbytes = self._wrap(child), 0
             else:
-                return dset
-    
+                if self.refresh:
+                    oid.refresh()
+                raw = _read_raw(oid) if self.stats is None else None
+                if raw is not None:
+                    value, nbytes = _decode_raw(read_tag(oid), raw,
+                                                self.codec)
+                else:
+                    value, nbytes = self._decode(h5py.Dataset(oid))
+            obj[name.decode()] = value
+            size += nbytes
+        return obj, size
+
+    def _decode(self, dset):
+        """Read and decode the given h5py.Dataset, recording statistics if
+        enabled. Return the value together with the number of bytes read.
+        """
+        if self.stats is None:
+            return _decode(dset, self.codec)
+        time0 = _stats.timer()
+        tag, raw = read_tag(dset), dset[()]
+        return self._decode_timed(tag, raw, dset.name, time0)
+
+    def _decode_timed(self, tag, raw, path, time0):
+        """Decode a raw value read since time "time0", recording statistics.
+        """
+        stats = self.stats
+        time1 = _stats.timer()
+        value, size = _decode_raw(tag, raw, self.codec)
+        time2 = _stats.timer()
+        stats.record('read', path, size, time1-time0)
+        if tag is None:
+            stats.record('fallback' if value is raw else 'legacy', path)
+        elif tag != NATIVE and tag != NDARRAY:
+            stats.record('decode', path, size, time2-time1)
+        return value, size
+
+    def get_many(self, keys, default=_MISSING):
+        """Load many objects at once. Return list of objects in the order of
+        the given keys. Each group along the way is looked up only once, and
+        small datasets are read using the low-level API. If a key does not
+        exist, return "default" in its place, or raise KeyError if no default
+        is given.
+        """
+        values = []
+        parents = {'': self.h5group}
+        usecache = self.cache is not None and self.return_value is True \
+            and self.decode
+        fast = self.return_value is True and self.decode
+        for key in keys:
+            path = None
+            if usecache:
+                path = self._path(key)
+                value = self.cache.get(path, _MISSING)
+                if value is not _MISSING:
+                    values.append(value)
+                    continue
+            parentname, name = posixpath.split(key)
+            parent = parents.get(parentname)
+            if parent is None:
+                parent = self.h5group.get(parentname)
+                if not isinstance(parent, h5py.Group):
+                    parent = False
+                parents[parentname] = parent
+            try:
+                if parent is False or not name:
+                    raise KeyError(key)
+                oid = h5py.h5o.open(parent.id, name.encode())
+            except KeyError:
+                if default is _MISSING:
+                    raise KeyError(key)
+                values.append(default)
+                continue
+            if fast and isinstance(oid, h5py.h5d.DatasetID):
+                if self.refresh:
+                    oid.refresh()
+                time0 = _stats.timer() if self.stats is not None else None
+                raw = _read_raw(oid)
+                if raw is not None:
+                    tag = read_tag(oid)
+                    if time0 is None:
+                        value, size = _decode_raw(tag, raw, self.codec)
+                    else:
+                        value, size = self._decode_timed(
+                            tag, raw, self._path(key), time0)
+                    if usecache:
+                        self.cache.put(path, value, size)
+                    values.append(value)
+                    continue
+            obj = h5py.Dataset(oid) if isinstance(oid, h5py.h5d.DatasetID) \
+                else h5py.Group(oid)
+            values.append(self._value(obj, path))
+        return values
+
     def get(self, name, default=None, getclass=False, getlink=False):
         return self.h5group.get(name, default=default, getclass=getclass,
                                 getlink=getlink)
 
     def __setitem__(self, key, obj):
-        try:
-            self.h5group.create_dataset(key, data=obj)
-        except (ValueError, TypeError):
-            if self.encode:
-                s = json.dumps(obj)
-                self.h5group.create_dataset(key, data=s)
+        prepared = self._prepare(obj)
+        if self.tree and key in self.h5group and self._in_tree(key):
+            self._replace(key, prepared)
+        else:
+            self._store(self.h5group, key, prepared)
+
+    def _in_tree(self, key):
+        """Check if the given key is a member of a dictionary stored as tree.
+        """
+        parentname = posixpath.dirname(key)
+        parent = self.h5group[parentname] if parentname else self.h5group
+        return _is_tree(parent)
+
+    def _replace(self, key, prepared):
+        """Replace the member "key" of a dictionary stored as tree by the
+        output of _prepare(), keeping its position within the dictionary. New
+        links always come last in creation order, so the members following it
+        are relinked (no data is copied).
+        """
+        parentname, name = posixpath.split(key)
+        parent = self.h5group[parentname] if parentname else self.h5group
+        names = [bname.decode() for bname in parent.id]
+        later = names[names.index(name)+1:]
+        self.__delitem__(key)
+        if self.stats is not None:
+            self.stats.record('rewrite', self._path(key))
+        self._store(parent, name, prepared)
+        temp = _MOVING
+        while temp in parent:
+            temp += '_'
+        for other in later:
+            parent.move(other, temp)
+            parent.move(temp, other)
+        if later:
+            self._changed(parent.name)
+
+    def _prepare(self, obj):
+        """Prepare the given object for writing. Return type tag, data and
+        keyword arguments for h5py.Group.create_dataset.
+        """
+        if self.tree and self.encode and type(obj) is dict \
+                and _tree_keys(obj):
+            return DICT, {key: self._prepare(value)
+                          for key, value in obj.items()}, {}
+        # choose the strategy up front, so that every object is written
+        # exactly once (no read-back, no delete-and-rewrite)
+        tag = strategy(obj) if self.encode else NATIVE
+        if tag == ENCODED:
+            time0 = _stats.timer() if self.stats is not None else None
+            data = self.codec.encode(obj)
+            tag = self.codec.tag
+            if time0 is not None:
+                self.stats.record('encode', None, len(data),
+                                  _stats.timer()-time0)
+            if self.codec.binary or (self.policy is not None
+                                     and self.policy.as_bytes(data)):
+                data = _policy.to_bytes(data)
+        elif tag == LIST or tag == TUPLE:
+            data = numpy.array(obj)
+        else:
+            data = obj
+        if self.policy is not None and isinstance(data, numpy.ndarray):
+            kwargs = self.policy.dataset_kwargs(data)
+        else:
+            kwargs = {}
+        return tag, data, kwargs
+
+    def _store(self, h5group, name, prepared):
+        """Create the dataset "name" inside the given h5py.Group from the
+        output of _prepare() (or the group, for a dictionary stored as tree),
+        tag it, and invalidate the cache.
+        """
+        tag, data, kwargs = prepared
+        if tag == DICT:
+            group = h5group.create_group(name, track_order=True)
+            write_tag(group, DICT)
+            for key, child in data.items():
+                self._store(group, key, child)
+            self._changed(group.name)
+            return group
+        key = _dedup.digest(tag, data) if self.dedup else None
+        if key is not None:
+            dset = _dedup.lookup(h5group.file, key)
+            if dset is not None:
+                h5group[name] = dset
+                dset = h5group[name]
+                if self.stats is not None:
+                    self.stats.record('dedup', dset.name, _nbytes(data))
+                self._changed(dset.name)
+                return dset
+        time0 = _stats.timer() if self.stats is not None else None
+        dset = h5group.create_dataset(name, data=data, **kwargs)
+        write_tag(dset, tag)
+        if time0 is not None:
+            self.stats.record('write', dset.name, _nbytes(data),
+                              _stats.timer()-time0)
+        if key is not None:
+            _dedup.register(h5group.file, key, dset)
+        self._changed(dset.name)
+        return dset
+
+    def set_many(self, mapping):
+        """Store many objects at once. Expect dictionary or iterable of
+        (key, object) pairs. All objects are prepared (strategy, encoding)
+        before anything is written, so an object that cannot be stored leaves
+        the file untouched. Missing intermediate groups are created once per
+        group.
+        """
+        items = mapping.items() if hasattr(mapping, 'items') else mapping
+        prepared = [(key, self._prepare(obj)) for key, obj in items]
+        parents = {'': self.h5group}
+        for key, prep in prepared:
+            parentname, name = posixpath.split(key)
+            parent = parents.get(parentname)
+            if parent is None:
+                parent = self.h5group.require_group(parentname)
+                parents[parentname] = parent
+            if self.tree and name in parent and _is_tree(parent):
+                self._replace(key, prep)
+            else:
+                self._store(parent, name, prep)
+
+    def append(self, key, obj):
+        """Append a record to the series "key" (a dataset that is resizable
+        along its first axis), creating the series if it does not exist.
+        Only the new record is encoded and written, so appending takes
+        constant time. Reading the series returns a numpy array if it holds
+        numeric records (numbers and numeric numpy arrays of the same shape),
+        otherwise a list of the objects, each of them encoded by the codec.
+
+        Series support HDF5 single-writer/multiple-reader (SWMR) mode: create
+        all series in a file opened with libver="latest", set "swmr_mode" of
+        the file to True, and keep appending (flush the file to publish the
+        records), while readers open the file with "swmr=True" and see the
+        records published so far. HDF5 does not support variable-length data
+        in SWMR mode, so readers of series of objects have to reopen the file
+        to see new records, whereas numeric series are refreshed on every
+        read.
+        """
+        self.extend(key, [obj])
+
+    def extend(self, key, objs):
+        """Append many records to the series "key" at once (see append()).
+        """
+        objs = list(objs)
+        if not objs:
+            return
+        time0 = _stats.timer() if self.stats is not None else None
+        dset = self.h5group.get(key)
+        if dset is None:
+            data = _numeric_records(objs)
+            if data is not None:
+                tag = SERIES
+                dtype, record_shape = data.dtype, data.shape[1:]
             else:
-                raise
+                tag = SERIES_PREFIX+self.codec.tag
+                dtype, record_shape = _payload_dtype(self.codec), ()
+            dset = self.h5group.create_dataset(
+                key, **_policy.series_kwargs(record_shape, dtype,
+                                             self.policy))
+            write_tag(dset, tag)
+        else:
+            tag = read_tag(dset) if isinstance(dset, h5py.Dataset) else None
+            if tag is None or not tag.startswith(SERIES):
+                raise TypeError('"%s" is not a series' % key)
+        if tag == SERIES:
+            data = numpy.asarray(objs)
+            if data.shape[1:] != dset.shape[1:]:
+                raise ValueError('cannot append records of shape %s to a '
+                                 'series of records of shape %s'
+                                 % (data.shape[1:], dset.shape[1:]))
+            if not numpy.can_cast(data.dtype, dset.dtype, 'same_kind'):
+                raise TypeError('cannot append records of type %s to a '
+                                'series of type %s' % (data.dtype, dset.dtype))
         else:
-            # this executes only if no encoding seemed to be necessary but apparently type could
-            # not be preserved, so use encoding anyway
-            if type(self.h5group[key][()]) is not type(obj) and self.encode: #self.h5group[key].value
-                del self.h5group[key]
-                s = json.dumps(obj)
-                #tid = h5py.h5t.C_S1.copy()
-                #tid.set_size(256)
-                #H5T_C_S1_256 = h5py.Datatype(tid)
-                self.h5group.create_dataset(key, data=s)#, dtype=str) #H5T_C_S1_256
+            codec = _series_codec(tag, self.codec)
+            if codec is None:
+                raise ValueError('no codec available for series "%s" (%s)'
+                                 % (key, tag))
+            data = _encode_records(objs, codec)
+        length = len(dset)
+        dset.resize(length+len(objs), axis=0)
+        if data.dtype.kind == 'O' and codec.binary:
+            # h5py would try to broadcast payloads of the same length
+            for i, payload in enumerate(data):
+                dset[length+i] = payload
+        else:
+            dset[length:] = data
+        if time0 is not None:
+            self.stats.record('write', dset.name, _nbytes(data),
+                              _stats.timer()-time0)
+        self._changed(dset.name)
 
     def __delitem__(self, key):
+        h5file = self.h5group.file
+        obj = self.h5group.get(key) if _dedup.enabled(h5file) else None
+        isgroup = isinstance(obj, h5py.Group)
+        if isgroup:
+            obj = None  # must be closed before sweeping the registry
         del self.h5group[key]
+        if obj is not None:
+            _dedup.release(h5file, obj)
+        elif isgroup:
+            _dedup.sweep(h5file)
+        self._removed(self._path(key))
+        if self.stats is not None:
+            self.stats.record('delete', self._path(key))
 
     def __len__(self):
-        return len(self.h5group)
+        if self.index is not None:
+            length = len(self.index.children(self.h5group.name))
+        else:
+            length = len(self.h5group)
+        if self.h5group.name == '/' and _dedup.HIDDEN in self.h5group:
+            length -= 1
+        return length
 
     def __iter__(self):
-        return iter(self.h5group)
+        if self.index is not None:
+            names = list(self.index.children(self.h5group.name))
+        else:
+            names = self.h5group
+        if self.h5group.name == '/':
+            return (name for name in names if name != _dedup.HIDDEN)
+        return iter(names)
 
     def __contains__(self, name):
+        if self.index is not None:
+            return self._path(name) in self.index
         return name in self.h5group
 
     def copy(self, source, dest, name=None):
-        self.h5group.copy(source, dest, name=name)
+        if isinstance(source, Group):
+            source = source.h5group
+        if isinstance(dest, Group):
+            dest = dest.h5group
+        if isinstance(source, str):
+            source = self.h5group[source]
+        if isinstance(dest, str):
+            dest, name = self.h5group, dest
+        elif name is None:
+            name = posixpath.basename(source.name)
+        if self.dedup and source.file == dest.file:
+            _copying.link(source, dest, name)
+        else:
+            self.h5group.copy(source, dest, name=name)
+        if dest.file == self.h5group.file:
+            self._changed(posixpath.join(dest.name, name))
+
+    def move(self, source, dest):
+        """Move (rename) the object "source" to "dest" within the file. Only
+        the link is moved (no data is copied), so this takes constant time.
+        """
+        sourcepath, destpath = self._path(source), self._path(dest)
+        self.h5group.move(source, dest)
+        self._removed(sourcepath)
+        self._changed(destpath)
+
+    def transaction(self):
+        """Return a write-buffered transaction on this group, to be used as
+        context manager (see h5obj.transaction).
+        """
+        return _transaction.Transaction(self)
 
     def visit(self, func):
         return self.h5group.visit(func)
@@ -143,14 +956,32 @@ class File(Group):
     """Wrapper for h5py.File, using json strings for native Python objects so
     those objects can later be retrieved from HDF5 files with their original
     type.
+
+    The codec selected for a file is recorded in the file (root attribute
+    "h5obj_codec"). If "codec" is not given, the recorded codec is used (or
+    json, if it is not available).
     """
     def __init__(self, name, mode=None, driver=None, libver=None, encode=True,
-                 decode=True, return_value=True, **kwargs):
-        self.h5group = h5py.File(name, mode=mode, driver=driver, libver=libver,
-                                 **kwargs)
-        self.encode = encode
-        self.decode = decode
-        self.return_value = return_value
+                 decode=True, return_value=True, codec=None, policy=None,
+                 cache=None, index=None, stats=None, tree=False, dedup=False,
+                 **kwargs):
+        Group.__init__(self, h5py.File(name, mode=mode, driver=driver,
+                                       libver=libver, **kwargs),
+                       encode=encode, decode=decode,
+                       return_value=return_value, policy=policy, cache=cache,
+                       index=index, stats=stats, tree=tree, dedup=dedup)
+        if self.h5group.id.get_intent() & h5py.h5f.ACC_SWMR_READ:
+            self.refresh = True
+        if codec is None:
+            codec = codecs.get(self.h5group.attrs.get(CODEC_ATTR,
+                                                      codecs.DEFAULT),
+                               fallback=codecs.DEFAULT)
+        else:
+            codec = codecs.get(codec)
+            if self.h5group.mode != 'r' \
+                    and self.h5group.attrs.get(CODEC_ATTR) != codec.name:
+                self.h5group.attrs[CODEC_ATTR] = codec.name
+        self.codec = codec
 
     @property
     def attrs(self):
@@ -176,6 +1007,14 @@ class File(Group):
     def libver(self):
         return self.h5group.libver
 
+    @property
+    def swmr_mode(self):
+        return self.h5group.swmr_mode
+
+    @swmr_mode.setter
+    def swmr_mode(self, value):
+        self.h5group.swmr_mode = value
+
     def close(self):
         self.h5group.close()
 
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Define a size-bounded LRU cache of decoded values, used by h5obj.File to
+avoid reading and decoding the same datasets again and again.
+
+Example:
+
+    >>> import h5obj
+    >>> with h5obj.File('data.h5', 'r', cache=True) as f:
+    ...     for i in range(1000):
+    ...         config = f['config']
+    ...     print(f.cache.hits, f.cache.misses)
+    999 1
+"""
+
+import collections
+
+
+class ValueCache(object):
+    """LRU cache of decoded values, keyed by absolute dataset path. At most
+    "max_entries" values (if given) of at most "max_bytes" bytes in total (if
+    given) are kept, least recently used values are evicted first. Values
+    larger than "max_bytes" are not cached at all.
+
+    Cached values are shared between all readers, they must not be modified
+    in place.
+    """
+    def __init__(self, max_entries=1024, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, path, default=None):
+        """Return the cached value of the given path, or "default" if it is
+        not cached. Count as hit or miss.
+        """
+        try:
+            value, size = self._entries[path]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(path)
+        self.hits += 1
+        return value
+
+    def put(self, path, value, size=0):
+        """Cache the value of the given path, "size" being its (estimated)
+        size in bytes. Evict least recently used values if necessary.
+        """
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self.discard(path)
+        self._entries[path] = value, size
+        self.nbytes += size
+        while (self.max_entries is not None
+               and len(self._entries) > self.max_entries) \
+                or (self.max_bytes is not None
+                    and self.nbytes > self.max_bytes):
+            oldpath, (oldvalue, oldsize) = self._entries.popitem(last=False)
+            self.nbytes -= oldsize
+            self.evictions += 1
+
+    def discard(self, path):
+        """Remove the given path from the cache, if it is cached.
+        """
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+    def invalidate(self, path):
+        """Remove the given path, all paths below it and all paths above it
+        from the cache (values of parents may contain the value of the given
+        path).
+        """
+        path = path.rstrip('/') or '/'
+        if path == '/':
+            self.clear()
+            return
+        self.discard(path)
+        parent = path
+        while parent.count('/') > 1:
+            parent = parent.rsplit('/', 1)[0]
+            self.discard(parent)
+        prefix = path+'/'
+        for other in [other for other in self._entries
+                      if other.startswith(prefix)]:
+            self.discard(other)
+
+    def clear(self):
+        """Remove all values from the cache (counters are kept).
+        """
+        self._entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        """Return dictionary of the cache counters.
+        """
+        return dict(hits=self.hits, misses=self.misses,
+                    evictions=self.evictions, entries=len(self._entries),
+                    nbytes=self.nbytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return path in self._entries
+
+    def __repr__(self):
+        return '<h5obj value cache: %i entries, %i bytes, %i hits, ' \
+               '%i misses>' % (len(self._entries), self.nbytes, self.hits,
+                               self.misses)
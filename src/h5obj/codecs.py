@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Define the codecs that h5obj uses to store objects which have no native
+HDF5 equivalent, and a registry to select them by name.
+
+Built-in codecs:
+
+- "json": the json module of the standard library (default)
+- "orjson": the orjson package (optional dependency), which produces the same
+  format much faster
+- "binary": a compact binary format, storing homogeneous lists and tuples of
+  numbers as packed arrays. It also preserves tuples, complex numbers, bytes
+  and non-string dictionary keys.
+
+Codecs of the same family share a type tag, e.g. datasets written with
+"orjson" are tagged "json" and can be read back with the standard library
+alone.
+"""
+
+import array
+import json
+import math
+import re
+import struct
+import sys
+
+from h5obj import lazyimport
+
+JSON = 'json'
+BINARY = 'binary'
+DEFAULT = 'json'
+
+_registry = {}
+
+
+class Codec(object):
+    """Base class of all codecs. "name" selects the codec, "tag" is stored
+    with every dataset written with it. If "binary" is True, encode() returns
+    bytes that are stored as byte array, otherwise the payload is stored as
+    string.
+    """
+    name = None
+    tag = None
+    binary = False
+
+    def encode(self, obj):
+        raise NotImplementedError
+
+    def decode(self, data):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return '<h5obj codec "%s">' % self.name
+
+
+class JsonCodec(Codec):
+    """Codec using the json module of the standard library.
+    """
+    name = 'json'
+    tag = JSON
+
+    def encode(self, obj):
+        return json.dumps(obj)
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(Codec):
+    """Codec using the orjson package. Objects that orjson would refuse or
+    alter (integers beyond 64 bit, NaN and infinity, non-string dictionary
+    keys) are encoded using the json module, and payloads that orjson would
+    not parse faithfully (NaN, infinity, integers beyond 64 bit) are decoded
+    using the json module.
+    """
+    name = 'orjson'
+    tag = JSON
+
+    def __init__(self):
+        # imported on first use, raise ImportError if orjson is missing
+        self._orjson = lazyimport.module('orjson')
+
+    def encode(self, obj):
+        if not _orjson_safe(obj):
+            return json.dumps(obj)
+        try:
+            return self._orjson.dumps(obj)
+        except TypeError:  # orjson.JSONEncodeError
+            return json.dumps(obj)
+
+    def decode(self, data):
+        long_int = _LONG_INT_STR if isinstance(data, str) else _LONG_INT
+        if long_int.search(data) is not None:
+            return json.loads(data)
+        try:
+            return self._orjson.loads(data)
+        except ValueError:  # orjson.JSONDecodeError
+            return json.loads(data)
+
+
+# runs of digits that may form an integer beyond the range of orjson (which
+# parses them as float); strings containing such runs are merely decoded more
+# slowly
+_LONG_INT = re.compile(rb'\d{20}')
+_LONG_INT_STR = re.compile(r'\d{20}')
+
+
+def _orjson_safe(obj):
+    """Return True if orjson encodes the given object without loss, i.e. it
+    contains neither non-finite floats nor integers beyond 64 bit.
+    """
+    if isinstance(obj, float):
+        return math.isfinite(obj)
+    if isinstance(obj, int):
+        return -2**63 <= obj < 2**64
+    if isinstance(obj, (list, tuple)):
+        return all(map(_orjson_safe, obj))
+    if isinstance(obj, dict):
+        return all(map(_orjson_safe, obj.values()))
+    return True
+
+
+class BinaryCodec(Codec):
+    """Compact binary codec for nested containers of numbers. Each value is
+    written as a one-byte type code followed by its payload (little endian).
+    Non-empty homogeneous lists and tuples of int or float are stored as
+    packed arrays.
+    """
+    name = 'binary'
+    tag = BINARY
+    binary = True
+
+    VERSION = b'\x01'
+
+    def encode(self, obj):
+        out = [self.VERSION]
+        self._encode(obj, out)
+        return b''.join(out)
+
+    def decode(self, data):
+        data = memoryview(data)
+        if data[:1] != self.VERSION:
+            raise ValueError('unknown binary codec version')
+        obj, pos = self._decode(data, 1)
+        return obj
+
+    def _encode(self, obj, out):
+        otype = type(obj)
+        if obj is None:
+            out.append(b'N')
+        elif obj is True:
+            out.append(b'T')
+        elif obj is False:
+            out.append(b'F')
+        elif otype is int:
+            if -2**63 <= obj < 2**63:
+                out.append(b'i' + _INT64.pack(obj))
+            else:
+                raw = obj.to_bytes((obj.bit_length()+8)//8, 'little',
+                                   signed=True)
+                out.append(b'I' + _UINT32.pack(len(raw)) + raw)
+        elif otype is float:
+            out.append(b'd' + _FLOAT64.pack(obj))
+        elif otype is complex:
+            out.append(b'c' + _COMPLEX128.pack(obj.real, obj.imag))
+        elif otype is str:
+            raw = obj.encode('utf-8')
+            out.append(b's' + _UINT32.pack(len(raw)) + raw)
+        elif otype is bytes:
+            out.append(b'b' + _UINT32.pack(len(obj)) + obj)
+        elif otype is list or otype is tuple:
+            packed = _pack(obj)
+            if packed is not None:
+                code = b'P' if otype is list else b'Q'
+                out.append(code + packed.typecode.encode() +
+                           _UINT32.pack(len(packed)))
+                out.append(packed.tobytes())
+            else:
+                code = b'l' if otype is list else b't'
+                out.append(code + _UINT32.pack(len(obj)))
+                for item in obj:
+                    self._encode(item, out)
+        elif otype is dict:
+            out.append(b'm' + _UINT32.pack(len(obj)))
+            for key, value in obj.items():
+                self._encode(key, out)
+                self._encode(value, out)
+        elif isinstance(obj, int):  # subclasses, e.g. IntEnum
+            self._encode(int(obj), out)
+        elif isinstance(obj, float):  # e.g. numpy.float64
+            self._encode(float(obj), out)
+        elif isinstance(obj, str):
+            self._encode(str(obj), out)
+        else:
+            raise TypeError('Object of type %s is not supported by the '
+                            'binary codec' % otype.__name__)
+
+    def _decode(self, data, pos):
+        code = data[pos:pos+1].tobytes()
+        pos += 1
+        if code == b'N':
+            return None, pos
+        if code == b'T':
+            return True, pos
+        if code == b'F':
+            return False, pos
+        if code == b'i':
+            return _INT64.unpack_from(data, pos)[0], pos+8
+        if code == b'd':
+            return _FLOAT64.unpack_from(data, pos)[0], pos+8
+        if code == b'c':
+            real, imag = _COMPLEX128.unpack_from(data, pos)
+            return complex(real, imag), pos+16
+        length = _UINT32.unpack_from(data, pos)[0] \
+            if code != b'P' and code != b'Q' else None
+        if code == b'I':
+            pos += 4
+            return int.from_bytes(data[pos:pos+length], 'little',
+                                  signed=True), pos+length
+        if code == b's':
+            pos += 4
+            return str(data[pos:pos+length], 'utf-8'), pos+length
+        if code == b'b':
+            pos += 4
+            return data[pos:pos+length].tobytes(), pos+length
+        if code == b'P' or code == b'Q':
+            typecode = chr(data[pos])
+            length = _UINT32.unpack_from(data, pos+1)[0]
+            pos += 5
+            packed = array.array(typecode)
+            end = pos+length*packed.itemsize
+            packed.frombytes(data[pos:end])
+            if _BIG_ENDIAN:
+                packed.byteswap()
+            items = packed.tolist()
+            return (items if code == b'P' else tuple(items)), end
+        if code == b'l' or code == b't':
+            pos += 4
+            items = []
+            for i in range(length):
+                item, pos = self._decode(data, pos)
+                items.append(item)
+            return (items if code == b'l' else tuple(items)), pos
+        if code == b'm':
+            pos += 4
+            obj = {}
+            for i in range(length):
+                key, pos = self._decode(data, pos)
+                obj[key], pos = self._decode(data, pos)
+            return obj, pos
+        raise ValueError('invalid type code %r in binary payload' % code)
+
+
+_INT64 = struct.Struct('<q')
+_UINT32 = struct.Struct('<I')
+_FLOAT64 = struct.Struct('<d')
+_COMPLEX128 = struct.Struct('<dd')
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+
+def _pack(seq):
+    """Pack a non-empty homogeneous sequence of int (64 bit) or float into an
+    array. Return None if that is not possible.
+    """
+    if not seq:
+        return None
+    itype = type(seq[0])
+    if itype is float:
+        typecode = 'd'
+    elif itype is int:
+        typecode = 'q'
+    else:
+        return None
+    for item in seq:
+        if type(item) is not itype:
+            return None
+    if typecode == 'q' and (min(seq) < -2**63 or max(seq) >= 2**63):
+        return None
+    packed = array.array(typecode, seq)
+    if packed.itemsize != 8:
+        return None
+    if _BIG_ENDIAN:
+        packed.byteswap()
+    return packed
+
+
+def register(codec):
+    """Register a codec instance under its name, replacing any codec of the
+    same name.
+    """
+    if not codec.name or not codec.tag:
+        raise ValueError('codec must define "name" and "tag"')
+    _registry[codec.name] = codec
+
+
+def get(codec, fallback=None):
+    """Return the registered codec with the given name. If a Codec instance is
+    given, it is returned as it is. If the name is unknown, return the codec
+    named "fallback", or raise ValueError if no fallback is given.
+    """
+    if isinstance(codec, Codec):
+        return codec
+    if codec in _registry:
+        return _registry[codec]
+    if fallback is not None:
+        return _registry[fallback]
+    raise ValueError('unknown codec "%s", available codecs: %s'
+                     % (codec, ', '.join(available())))
+
+
+def for_tag(tag):
+    """Return a registered codec that is able to decode datasets with the
+    given type tag, or None. Codecs of the given name are preferred.
+    """
+    codec = _registry.get(tag)
+    if codec is not None and codec.tag == tag:
+        return codec
+    for codec in _registry.values():
+        if codec.tag == tag:
+            return codec
+    return None
+
+
+def available():
+    """Return sorted list of the names of all registered codecs.
+    """
+    return sorted(_registry)
+
+
+register(JsonCodec())
+register(BinaryCodec())
+try:
+    register(OrjsonCodec())
+except ImportError:
+    pass
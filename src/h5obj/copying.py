@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Copy datasets and groups between HDF5 files (or within one file) without
+decoding their contents.
+
+Objects are copied by the HDF5 library (H5Ocopy), which keeps attributes
+(including the h5obj type tags), chunking and filters. Datasets of more than
+"stream_size" bytes that are copied to another file are streamed chunk by
+chunk instead (raw chunks are copied as they are, without decompression), so
+that the memory needed is bounded by the chunk (or block) size. Within files
+with deduplicated values (see h5obj.dedup), link() copies datasets by
+creating hard links, which takes constant time.
+
+Example:
+
+    >>> import h5py
+    >>> from h5obj import copying
+    >>> with h5py.File('in.h5', 'r') as src, h5py.File('out.h5', 'a') as dst:
+    ...     copying.copy(src['results'], dst, 'results')
+"""
+
+from h5obj import lazyimport
+from h5obj.tags import SERIES, read_tag
+h5py = lazyimport.module('h5py')
+numpy = lazyimport.module('numpy')
+
+STREAM_SIZE = 64*1024*1024
+BLOCK_SIZE = 8*1024*1024
+
+
+def copy(source, dest, name, stream_size=STREAM_SIZE):
+    """Copy the h5py dataset or group "source" into the h5py group "dest"
+    under the given name. Within a file, the object is copied by the HDF5
+    library. When copying to another file, datasets of more than
+    "stream_size" bytes are streamed (see copy_dataset). Return the new
+    object.
+    """
+    if source.file == dest.file or stream_size is None \
+            or not _has_large_dataset(source, stream_size):
+        dest.copy(source, dest, name=name)
+        return dest[name]
+    if isinstance(source, h5py.Dataset):
+        return copy_dataset(source, dest, name)
+    group = create_group_like(source, dest, name)
+    copy_attrs(source, group)
+    for key in source:
+        if not copy_link(source, group, key):
+            copy(source[key], group, key, stream_size=stream_size)
+    return group
+
+
+def link(source, dest, name):
+    """Copy the h5py dataset or group "source" into the h5py group "dest" of
+    the same file under the given name, creating hard links to the datasets
+    instead of copying their data. Groups are created anew (with their
+    attributes), so that members can be added and removed independently. Soft
+    and external links are recreated. Series are copied, as they are changed
+    in place when appending. Return the new object.
+    """
+    if isinstance(source, h5py.Dataset):
+        tag = read_tag(source)
+        if tag is not None and tag.startswith(SERIES):
+            dest.copy(source, dest, name=name)
+        else:
+            dest[name] = source
+        return dest[name]
+    group = create_group_like(source, dest, name)
+    copy_attrs(source, group)
+    for key in source:
+        if not copy_link(source, group, key):
+            link(source[key], group, key)
+    return group
+
+
+def copy_link(source, dest, name):
+    """Recreate the member "name" of the h5py group "source" in the h5py
+    group "dest" if it is a soft or external link. Return True if it was
+    recreated, False if it is a hard link (an object that has to be copied).
+    """
+    sourcelink = source.get(name, getlink=True)
+    if isinstance(sourcelink, h5py.SoftLink):
+        dest[name] = h5py.SoftLink(sourcelink.path)
+    elif isinstance(sourcelink, h5py.ExternalLink):
+        dest[name] = h5py.ExternalLink(sourcelink.filename, sourcelink.path)
+    else:
+        return False
+    return True
+
+
+def create_group_like(source, dest, name):
+    """Create an empty group in the h5py group "dest" under the given name,
+    tracking the creation order of its members if the h5py group "source"
+    does (e.g. dictionaries stored in tree mode). Return the new group.
+    """
+    gcpl = source.id.get_create_plist()
+    return dest.create_group(name,
+                             track_order=bool(gcpl.get_link_creation_order()))
+
+
+def copy_dataset(source, dest, name, block_size=BLOCK_SIZE, **kwargs):
+    """Copy the h5py dataset "source" into the h5py group "dest" under the
+    given name, streaming the data with bounded memory. The new dataset gets
+    the same type, shape, chunking, filters and attributes. If keyword
+    arguments for h5py.Group.create_dataset are given (e.g. chunks,
+    compression), they replace the storage options of the source. Return the
+    new dataset.
+    """
+    if kwargs:
+        if source.maxshape != source.shape:
+            kwargs.setdefault('maxshape', source.maxshape)
+        if source.dtype.kind in 'biufc':
+            kwargs.setdefault('fillvalue', source.fillvalue)
+        target = dest.create_dataset(name, shape=source.shape,
+                                     dtype=source.dtype, **kwargs)
+    else:
+        dcpl = source.id.get_create_plist()
+        dsid = h5py.h5d.create(dest.id, name.encode('utf-8'),
+                               source.id.get_type(), source.id.get_space(),
+                               dcpl=dcpl)
+        target = h5py.Dataset(dsid)
+    copy_attrs(source, target)
+    if not kwargs and source.chunks is not None \
+            and source.dtype.kind in 'biufcS':
+        _copy_raw_chunks(source, target)
+    else:
+        _copy_blocks(source, target, block_size)
+    return target
+
+
+def copy_attrs(source, dest):
+    """Copy all attributes of the h5py object "source" to the h5py object
+    "dest", keeping their types.
+    """
+    for key in source.attrs:
+        value = source.attrs[key]
+        if isinstance(value, h5py.Empty):
+            dest.attrs[key] = value
+            continue
+        aid = source.attrs.get_id(key)
+        dest.attrs.create(key, value, shape=aid.shape, dtype=aid.dtype)
+
+
+def _copy_raw_chunks(source, target):
+    """Copy all allocated chunks as they are stored (compressed), one at a
+    time.
+    """
+    sid, tid = source.id, target.id
+    for index in range(sid.get_num_chunks()):
+        offset = sid.get_chunk_info(index).chunk_offset
+        filter_mask, chunk = sid.read_direct_chunk(offset)
+        tid.write_direct_chunk(offset, chunk, filter_mask)
+
+
+def _copy_blocks(source, target, block_size):
+    """Copy the data in blocks of whole rows of about "block_size" bytes.
+    Blocks are aligned with the chunks of the source.
+    """
+    if source.size == 0:
+        return
+    if source.ndim == 0:
+        target[()] = source[()]
+        return
+    rowsize = max(1, int(numpy.prod(source.shape[1:]))*source.dtype.itemsize)
+    rows = max(1, block_size//rowsize)
+    if source.chunks is not None and rows > source.chunks[0]:
+        rows -= rows % source.chunks[0]
+    for start in range(0, source.shape[0], rows):
+        stop = min(start+rows, source.shape[0])
+        target[start:stop] = source[start:stop]
+
+
+def _has_large_dataset(obj, stream_size):
+    """Check if the given h5py object is a dataset of more than "stream_size"
+    bytes, or a group containing such a dataset.
+    """
+    if isinstance(obj, h5py.Dataset):
+        return _nbytes(obj) > stream_size
+    found = []
+
+    def check(name, member):
+        if isinstance(member, h5py.Dataset) and _nbytes(member) > stream_size:
+            found.append(name)
+            return True
+    obj.visititems(check)
+    return bool(found)
+
+
+def _nbytes(dset):
+    return dset.size*dset.dtype.itemsize
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Store identical values only once within an HDF5 file (option "dedup" of
+h5obj.File and h5obj.Group).
+
+Each dataset of at least MIN_SIZE bytes written in dedup mode is hashed
+(SHA-256 of its type tag, shape, data type and payload). The first dataset
+with a given hash is registered in the hidden group "/.h5obj/dedup" (as hard
+link named by the hash, the hash is also stored as attribute of the dataset),
+and identical values written later become hard links to it instead of new
+datasets. The registry is part of the file, so it survives reopening. Note
+that hard links share everything, including attributes.
+
+The hidden group is left out when iterating over the root group. Registry
+entries of datasets that are not linked anywhere else any more are removed
+when deleting through h5obj.
+
+Example:
+
+    >>> import h5obj
+    >>> with h5obj.File('data.h5', 'a', dedup=True) as f:
+    ...     for run in range(100):
+    ...         f['run%i/grid' % run] = grid  # stored only once
+"""
+
+import hashlib
+
+from h5obj import lazyimport
+h5py = lazyimport.module('h5py')
+numpy = lazyimport.module('numpy')
+
+HIDDEN = '.h5obj'  # hidden group of h5obj (member of the root group)
+GROUP = '/'+HIDDEN+'/dedup'
+DIGEST_ATTR = 'h5obj_digest'
+MIN_SIZE = 4096
+
+
+def digest(tag, data):
+    """Return the hash (hex string) of the data prepared for writing with the
+    given type tag, or None if it is smaller than MIN_SIZE bytes (or of a
+    type that is not deduplicated).
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+        header = (tag, 'str')
+    elif isinstance(data, bytes):
+        header = (tag, 'bytes')
+    elif isinstance(data, numpy.ndarray) and not data.dtype.hasobject:
+        data = numpy.ascontiguousarray(data)
+        header = (tag, data.shape, data.dtype.str)
+    else:
+        return None
+    if len(memoryview(data).cast('B')) < MIN_SIZE:
+        return None
+    sha = hashlib.sha256(repr(header).encode())
+    sha.update(data)
+    return sha.hexdigest()
+
+
+def enabled(h5file):
+    """Check if the given h5py.File has a registry of deduplicated values.
+    """
+    return GROUP in h5file
+
+
+def lookup(h5file, key):
+    """Return the h5py.Dataset registered under the given hash, or None.
+    """
+    if not enabled(h5file):
+        return None
+    return h5file[GROUP].get(key)
+
+
+def register(h5file, key, dset):
+    """Register the given h5py.Dataset under the given hash.
+    """
+    h5file.require_group(GROUP)[key] = dset
+    dset.attrs[DIGEST_ATTR] = key
+
+
+def release(h5file, dset):
+    """Remove the registry entry of the given h5py.Dataset (still open) after
+    it has been unlinked, if it is not linked anywhere else. After unlinking
+    a group, use sweep() instead.
+    """
+    if not h5py.h5a.get_num_attrs(dset.id) or DIGEST_ATTR not in dset.attrs:
+        return
+    if h5py.h5o.get_info(dset.id).rc != 1:
+        return  # still linked elsewhere
+    group = h5file[GROUP]
+    key = dset.attrs[DIGEST_ATTR]
+    if key in group and group[key].id == dset.id:
+        del group[key]
+
+
+def sweep(h5file):
+    """Remove all registry entries whose dataset is not linked anywhere else
+    (datasets of groups that are still open count as linked). Return the
+    number of entries removed.
+    """
+    if not enabled(h5file):
+        return 0
+    group = h5file[GROUP]
+    unused = [key for key in group
+              if h5py.h5o.get_info(group[key].id).rc == 1]
+    for key in unused:
+        del group[key]
+    return len(unused)
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Define a structural index of an HDF5 file, mapping object paths to their
+metadata (kind, shape, dtype, h5obj type tag, storage size, chunk shape and
+filters), so that classifying objects and listing groups never has to read
+any data.
+
+The index is filled lazily: a group is listed (once, names only) when its
+members are asked for, the metadata of single objects is read when they are
+looked up. Index.build() fills it completely with a single metadata-only
+traversal. Writes through h5obj refresh the affected paths incrementally.
+
+Example:
+
+    >>> import h5obj
+    >>> with h5obj.File('data.h5', 'r', index=True) as f:
+    ...     f.kind('results')
+    ...     f.index.get('/results/energy')
+    'group'
+    Entry(kind='dataset', shape=(1000,), dtype='float64', tag='ndarray',
+          size=8000, nbytes=8000, chunks=None, filters=())
+
+For listings that are too large to be kept in memory, iterentries() streams
+the metadata of the members of a group (recursively, if requested).
+"""
+
+import collections
+import posixpath
+
+from h5obj import dedup, lazyimport
+from h5obj.tags import read_tag
+h5py = lazyimport.module('h5py')
+
+GROUP = 'group'
+DATASET = 'dataset'
+LINK = 'link'  # soft or external link that cannot be resolved
+
+# size: storage size in bytes, nbytes: size of the data in memory (both None
+# for variable-length data, whose contents live on the heap of the file and
+# cannot be measured without reading them)
+Entry = collections.namedtuple('Entry', 'kind shape dtype tag size nbytes '
+                                        'chunks filters')
+
+# filter identifiers as defined by HDF5 (H5Zpublic.h), and by h5py for lzf
+FILTERS = {1: 'gzip', 2: 'shuffle', 3: 'fletcher32', 4: 'szip', 5: 'nbit',
+           6: 'scaleoffset', 32000: 'lzf'}
+
+_STALE = object()
+_HIDDEN = dedup.HIDDEN.encode()
+
+
+class Index(object):
+    """Structural index of the given h5py.File.
+    """
+    def __init__(self, h5file):
+        self.h5file = h5file
+        self._entries = {}  # path -> Entry (or _STALE)
+        self._children = {}  # group path -> member names (dict keys, ordered)
+        self._softlinks = set()  # paths of soft and external links
+
+    def get(self, path):
+        """Return the Entry of the given (absolute) path, or None if it does
+        not exist.
+        """
+        path = _norm(path)
+        entry = self._entries.get(path)
+        if entry is _STALE or (entry is None and posixpath.dirname(path)
+                               not in self._children):
+            entry = self._stat(path)
+            if entry is None:
+                self._entries.pop(path, None)
+            else:
+                self._entries[path] = entry
+        return entry
+
+    def kind(self, path):
+        """Return the kind of the object at the given path ("group",
+        "dataset" or "link"), or None if it does not exist.
+        """
+        entry = self.get(path)
+        return None if entry is None else entry.kind
+
+    def __contains__(self, path):
+        return self.get(path) is not None
+
+    def children(self, path='/'):
+        """Return list of the names of the members of the given group. The
+        group is listed only once, without reading the metadata of its
+        members.
+        """
+        path = _norm(path)
+        names = self._children.get(path)
+        if names is None:
+            names = self._load(path)
+        return list(names)
+
+    def items(self, path='/'):
+        """Return list of (name, Entry) pairs of the members of the given
+        group.
+        """
+        prefix = path.rstrip('/')+'/'
+        return [(name, self.get(prefix+name)) for name in self.children(path)]
+
+    def build(self):
+        """Fill the index completely, listing each group once (groups reached
+        through more than one hard link are listed under the first path only,
+        soft and external links are not followed). Return self.
+        """
+        visited = set()
+        stack = ['/']
+        while stack:
+            path = stack.pop()
+            gid = h5py.h5o.open(self.h5file.id, path.encode())
+            if hash(gid) in visited:
+                continue
+            visited.add(hash(gid))
+            prefix = path.rstrip('/')+'/'
+            for name in self.children(path):
+                entry = self.get(prefix+name)
+                if entry is not None and entry.kind == GROUP \
+                        and prefix+name not in self._softlinks:
+                    stack.append(prefix+name)
+        return self
+
+    def paths(self):
+        """Return list of all known paths (call build() first to get all
+        paths of the file).
+        """
+        return [path for path in self._entries if path != '/']
+
+    def refresh(self, path):
+        """Mark the given path as changed (created or overwritten), so that
+        its metadata is read again when needed. Newly created parent groups
+        are registered as well.
+        """
+        path = _norm(path)
+        entry = self._entries.get(path)
+        if path in self._children or (entry is not None and entry is not _STALE
+                                      and entry.kind == GROUP):
+            self._forget(path)  # a group has been replaced
+        else:
+            self._softlinks.discard(path)  # nothing below a dataset
+        while path != '/':
+            parent, name = posixpath.split(path)
+            self._entries[path] = _STALE
+            names = self._children.get(parent)
+            if names is not None:
+                names.setdefault(name)
+            if self._entries.get(parent) is not None:
+                break
+            path = parent
+
+    def remove(self, path):
+        """Remove the given path (and everything below it) from the index.
+        """
+        path = _norm(path)
+        self._forget(path)
+        self._entries.pop(path, None)
+        parent, name = posixpath.split(path)
+        names = self._children.get(parent)
+        if names is not None:
+            names.pop(name, None)
+
+    def clear(self):
+        """Forget everything.
+        """
+        self._entries.clear()
+        self._children.clear()
+        self._softlinks.clear()
+
+    def _forget(self, path):
+        """Forget everything below the given path.
+        """
+        self._children.pop(path, None)
+        prefix = path.rstrip('/')+'/'
+        for other in [other for other in self._entries
+                      if other.startswith(prefix)]:
+            del self._entries[other]
+        for other in [other for other in self._children
+                      if other.startswith(prefix)]:
+            del self._children[other]
+        self._softlinks = set(other for other in self._softlinks
+                              if other != path
+                              and not other.startswith(prefix))
+
+    def _load(self, path):
+        """List the names of the members of the given group. Their metadata
+        is read when they are looked up.
+        """
+        gid = h5py.h5o.open(self.h5file.id, path.encode())
+        if not isinstance(gid, h5py.h5g.GroupID):
+            raise TypeError('"%s" is not a group' % path)
+        prefix = path.rstrip('/')+'/'
+        names = dict.fromkeys(bname.decode('utf-8', 'surrogateescape')
+                              for bname in gid)
+        for name in names:
+            self._entries.setdefault(prefix+name, _STALE)
+        self._children[path] = names
+        return names
+
+    def _stat(self, path):
+        """Read the metadata of a single object.
+        """
+        if path == '/':
+            return _group_entry(self.h5file.id)
+        parent, name = posixpath.split(path)
+        try:
+            gid = h5py.h5o.open(self.h5file.id, parent.encode())
+            if not gid.links.exists(name.encode()):
+                return None
+        except KeyError:
+            return None
+        if gid.links.get_info(name.encode()).type != h5py.h5l.TYPE_HARD:
+            self._softlinks.add(path)
+        return _entry(gid, name.encode())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return '<h5obj index of "%s": %i entries>' \
+            % (self.h5file.filename, len(self._entries))
+
+
+def iterentries(h5file, path='/', recursive=False):
+    """Return generator of (path, Entry) pairs of the members of the given
+    group of the given h5py.File, without keeping them in memory. If
+    "recursive" is True, descend into subgroups (depth first, groups reached
+    through more than one hard link only once, links are not followed).
+    """
+    visited = set()
+    stack = [_norm(path)]
+    while stack:
+        path = stack.pop()
+        gid = h5py.h5o.open(h5file.id, path.encode())
+        if not isinstance(gid, h5py.h5g.GroupID):
+            raise TypeError('"%s" is not a group' % path)
+        if hash(gid) in visited:
+            continue
+        visited.add(hash(gid))
+        prefix = path.rstrip('/')+'/'
+        subgroups = []
+        for bname in gid:
+            if prefix == '/' and bname == _HIDDEN:
+                continue
+            name = prefix+bname.decode('utf-8', 'surrogateescape')
+            entry = _entry(gid, bname)
+            yield name, entry
+            if recursive and entry.kind == GROUP \
+                    and gid.links.get_info(bname).type == h5py.h5l.TYPE_HARD:
+                subgroups.append(name)
+        stack.extend(reversed(subgroups))
+
+
+def _entry(gid, bname):
+    """Read the metadata of the member "bname" of the given group.
+    """
+    try:
+        oid = h5py.h5o.open(gid, bname)
+    except KeyError:
+        return Entry(LINK, None, None, None, 0, 0, None, ())  # dangling link
+    if isinstance(oid, h5py.h5d.DatasetID):
+        dcpl = oid.get_create_plist()
+        chunks = dcpl.get_chunk() \
+            if dcpl.get_layout() == h5py.h5d.CHUNKED else None
+        filters = tuple(_filter_name(*dcpl.get_filter(index))
+                        for index in range(dcpl.get_nfilters()))
+        space, tid = oid.get_space(), oid.get_type()
+        shape = space.get_simple_extent_dims()
+        if tid.dtype.hasobject:
+            size = nbytes = None  # only the references are stored in place
+        else:
+            size = oid.get_storage_size()
+            nbytes = space.get_simple_extent_npoints()*tid.get_size()
+        tag = read_tag(oid) if h5py.h5a.get_num_attrs(oid) else None
+        return Entry(DATASET, shape, str(tid.dtype), tag, size, nbytes,
+                     chunks, filters)
+    if isinstance(oid, h5py.h5g.GroupID):
+        return _group_entry(oid)
+    return Entry(LINK, None, None, None, 0, 0, None, ())  # e.g. named datatype
+
+
+def _group_entry(gid):
+    return Entry(GROUP, None, None, read_tag(gid), 0, 0, None, ())
+
+
+def _filter_name(code, flags, values, name):
+    return FILTERS.get(code) or name.decode('utf-8', 'replace')
+
+
+def _norm(path):
+    """Normalize the given absolute path.
+    """
+    return posixpath.normpath('/'+path.lstrip('/'))
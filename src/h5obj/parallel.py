@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Load many datasets from many files in parallel, using a pool of processes.
+
+h5py serializes all calls behind a global lock, so threads do not speed up
+loading. Instead, the paths are grouped by file, and each file is handed to a
+worker process which opens it once and loads and decodes all requested
+datasets. Large numpy arrays are passed back through shared memory instead of
+being pickled.
+
+Example:
+
+    >>> from h5obj import parallel
+    >>> values = parallel.load('results/*.h5/run*/energy', jobs=8)
+"""
+
+import os
+
+import h5obj
+from h5obj import index as _index
+from h5obj import lazyimport
+numpy = lazyimport.module('numpy')
+
+SHM_THRESHOLD = 1024*1024
+
+
+def load(paths, jobs=None, shm_threshold=SHM_THRESHOLD):
+    """Load the datasets with the given combined filename/dataset paths.
+    "paths" may also be a pattern, which is expanded like h5glob (files in
+    sorted order, groups are left out). Return list of the values in the
+    order of the paths.
+
+    "jobs" is the number of worker processes (default: number of CPUs, but
+    not more than the number of files). With a single job or a single file,
+    everything is loaded in this process. Numpy arrays of at least
+    "shm_threshold" bytes are passed back through shared memory.
+    """
+    byfile = _group_by_file(paths)
+    values = [None]*sum(len(indices) for indices, names in byfile.values())
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(byfile))
+    if jobs <= 1:
+        for filename, (indices, dsetnames) in byfile.items():
+            for index, value in zip(indices, _load_file(filename, dsetnames)):
+                values[index] = value
+        return values
+    import concurrent.futures
+    with concurrent.futures.ProcessPoolExecutor(jobs) as pool:
+        futures = [(pool.submit(_load_file, filename, dsetnames,
+                                shm_threshold), indices)
+                   for filename, (indices, dsetnames) in byfile.items()]
+    # collect all results before raising any error, so that no segment of
+    # shared memory is left behind (workers that fail release their own
+    # segments)
+    error = None
+    for future, indices in futures:
+        try:
+            result = future.result()
+        except Exception as exc:
+            error = error or exc
+            continue
+        for index, value in zip(indices, result):
+            if isinstance(value, _SharedArray):
+                value = value.attach()
+            values[index] = value
+    if error is not None:
+        raise error
+    return values
+
+
+def _group_by_file(paths):
+    """Return dictionary mapping filenames to pairs of the positions and the
+    names of the requested datasets in that file.
+    """
+    from h5obj import tools
+    byfile = {}
+    count = 0
+    if isinstance(paths, str):
+        for filename, names in tools._glob_kinds(paths):
+            dsetnames = [name for name, kind in names
+                         if kind == _index.DATASET]
+            if dsetnames:
+                byfile[filename] = (list(range(count, count+len(dsetnames))),
+                                    dsetnames)
+                count += len(dsetnames)
+        return byfile
+    paths = list(paths)
+    for index, (filename, dsetname) in enumerate(tools.h5split_many(paths)):
+        if not filename or not dsetname:
+            raise KeyError('"%s" is not a path to a dataset' % paths[index])
+        byfile.setdefault(filename, ([], []))
+        byfile[filename][0].append(index)
+        byfile[filename][1].append(dsetname)
+    return byfile
+
+
+def _load_file(filename, dsetnames, shm_threshold=None):
+    """Open the given file once and load the given datasets. If
+    "shm_threshold" is given, numpy arrays of at least that many bytes are
+    moved to shared memory.
+    """
+    values = []
+    try:
+        with h5obj.File(filename, 'r') as f:
+            for dsetname in dsetnames:
+                value = f[dsetname]
+                if shm_threshold is not None \
+                        and isinstance(value, numpy.ndarray) \
+                        and value.nbytes >= shm_threshold \
+                        and not value.dtype.hasobject:
+                    value = _SharedArray.create(value)
+                values.append(value)
+    except BaseException:
+        # the parent never gets to see the segments created so far
+        for value in values:
+            if isinstance(value, _SharedArray):
+                value.release()
+        raise
+    return values
+
+
+class _SharedArray(object):
+    """Reference to a numpy array in a segment of shared memory, created by a
+    worker and attached (and released) by the parent process.
+    """
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    @classmethod
+    def create(cls, array):
+        from multiprocessing import resource_tracker, shared_memory
+        shm = shared_memory.SharedMemory(create=True, size=array.nbytes)
+        # the segment is released by the parent, so the resource tracker of
+        # the worker must not remove it when the worker exits
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        shared = cls(shm.name, array.shape, array.dtype)
+        try:
+            numpy.ndarray(array.shape, array.dtype, shm.buf)[...] = array
+        except BaseException:
+            shm.close()
+            shared.release()
+            raise
+        shm.close()
+        return shared
+
+    def release(self):
+        """Remove the shared memory without reading it.
+        """
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(self.name)
+        shm.close()
+        shm.unlink()
+
+    def attach(self):
+        """Return a copy of the array and release the shared memory. The copy
+        lives in private memory, so that it does not depend on the segment,
+        at the price of holding the array twice while copying.
+        """
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(self.name)
+        try:
+            shared = numpy.ndarray(self.shape, self.dtype, shm.buf)
+            array = shared.copy()
+            del shared
+        finally:
+            shm.close()
+            shm.unlink()
+        return array
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Define the storage policy of h5obj, deciding about chunking and
+compression of the datasets written by h5obj.Group and h5obj.File.
+
+Example:
+
+    >>> import h5obj
+    >>> policy = h5obj.policy.StoragePolicy(compression='lzf')
+    >>> with h5obj.File('data.h5', 'a', policy=policy) as f:
+    ...     f['results'] = results
+"""
+
+from h5obj import lazyimport
+numpy = lazyimport.module('numpy')
+
+COMPRESSIONS = ('gzip', 'lzf', None)
+
+# chunk size of series (see series_kwargs), small enough that short series do
+# not waste space and appending a record touches only little data
+SERIES_CHUNK_SIZE = 16*1024
+
+
+class StoragePolicy(object):
+    """Storage policy for datasets written by h5obj. Arrays of at least
+    "min_size" bytes are chunked (chunks of about "chunk_size" bytes) and
+    compressed using "compression" ("gzip", "lzf" or None), applying the
+    shuffle filter first if "shuffle" is True. Encoded payloads (e.g. json
+    strings) of at least "payload_size" bytes are stored as byte arrays, so
+    that they can be compressed as well.
+    """
+    def __init__(self, compression='gzip', compression_opts=4, shuffle=True,
+                 min_size=64*1024, chunk_size=1024*1024,
+                 payload_size=64*1024):
+        if compression not in COMPRESSIONS:
+            raise ValueError('compression must be one of %s'
+                             % ', '.join(map(str, COMPRESSIONS)))
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.shuffle = shuffle
+        self.min_size = min_size
+        self.chunk_size = chunk_size
+        self.payload_size = payload_size
+
+    def as_bytes(self, payload):
+        """Decide if the given encoded payload (str or bytes) shall be stored
+        as byte array.
+        """
+        return self.payload_size is not None \
+            and len(payload) >= self.payload_size
+
+    def dataset_kwargs(self, data):
+        """Return keyword arguments for h5py.Group.create_dataset, applying
+        this policy to the given numpy array.
+        """
+        return self.storage_kwargs(data.shape, data.dtype)
+
+    def storage_kwargs(self, shape, dtype):
+        """Return keyword arguments for h5py.Group.create_dataset, applying
+        this policy to an array of the given shape and dtype.
+        """
+        dtype = numpy.dtype(dtype)
+        if not shape or numpy.prod(shape)*dtype.itemsize < self.min_size \
+                or dtype.hasobject:
+            return {}
+        kwargs = dict(chunks=self.chunk_shape(shape, dtype.itemsize))
+        if self.compression is not None:
+            kwargs['compression'] = self.compression
+            if self.compression == 'gzip':
+                kwargs['compression_opts'] = self.compression_opts
+        if self.shuffle and dtype.itemsize > 1:
+            kwargs['shuffle'] = True
+        return kwargs
+
+    def chunk_shape(self, shape, itemsize):
+        """Return chunk shape of about "chunk_size" bytes for a dataset of the
+        given shape. Halve the largest dimension until the chunk is small
+        enough, so that chunks keep the proportions of the dataset.
+        """
+        chunks = [max(1, size) for size in shape]
+        while numpy.prod(chunks)*itemsize > self.chunk_size:
+            axis = chunks.index(max(chunks))
+            if chunks[axis] == 1:
+                break
+            chunks[axis] = (chunks[axis]+1)//2
+        return tuple(chunks)
+
+    def __repr__(self):
+        return '<h5obj storage policy: compression=%s, shuffle=%s, ' \
+               'min_size=%s, chunk_size=%s, payload_size=%s>' \
+               % (self.compression, self.shuffle, self.min_size,
+                  self.chunk_size, self.payload_size)
+
+
+def series_kwargs(record_shape, dtype, policy=None):
+    """Return keyword arguments for h5py.Group.create_dataset, creating an
+    empty series (resizable along the first axis) of records of the given
+    shape and dtype, with chunks of about SERIES_CHUNK_SIZE bytes. Series of
+    numbers are compressed according to the given policy.
+    """
+    dtype = numpy.dtype(dtype)
+    record_shape = tuple(record_shape)
+    # variable-length elements are stored as references of 16 bytes
+    itemsize = 16 if dtype.hasobject else dtype.itemsize
+    rowsize = int(numpy.prod(record_shape))*itemsize
+    rows = max(1, SERIES_CHUNK_SIZE//max(1, rowsize))
+    kwargs = dict(shape=(0,)+record_shape, maxshape=(None,)+record_shape,
+                  chunks=(rows,)+record_shape, dtype=dtype)
+    if policy is not None and policy.compression is not None \
+            and not dtype.hasobject:
+        kwargs['compression'] = policy.compression
+        if policy.compression == 'gzip':
+            kwargs['compression_opts'] = policy.compression_opts
+        if policy.shuffle and dtype.itemsize > 1:
+            kwargs['shuffle'] = True
+    return kwargs
+
+
+def to_bytes(payload):
+    """Return the given payload (str or bytes) as byte array.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    return numpy.frombuffer(payload, dtype=numpy.uint8)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Rewrite HDF5 files into fresh, compact files.
+
+HDF5 does not reclaim the space of deleted or overwritten datasets, so files
+that are modified for a long time keep growing. Repacking copies all objects
+(and their attributes, including the h5obj type tags and the recorded codec)
+into a new file, leaving the unused space behind. Encoded datasets are copied
+as they are, never decoded (with a storage policy, large payloads that are
+stored as strings are converted to compressed byte arrays).
+
+Example:
+
+    >>> from h5obj import repack
+    >>> report = repack.repack('data.h5')
+    >>> report.reclaimed
+    1048576
+"""
+
+import collections
+import os
+import posixpath
+import shutil
+import tempfile
+import time
+
+from h5obj import codecs, copying, lazyimport
+from h5obj import policy as _policy
+from h5obj.tags import read_tag
+h5py = lazyimport.module('h5py')
+
+Report = collections.namedtuple('Report',
+                                'input_size output_size reclaimed seconds')
+
+
+def repack(filename, output=None, policy=None,
+           stream_size=copying.STREAM_SIZE):
+    """Rewrite the given HDF5 file into a fresh file. If "output" is None,
+    the file is replaced (through a temporary file in the same directory, so
+    the original stays intact if anything goes wrong).
+
+    If a storage policy is given (True selects the default policy, see
+    h5obj.policy), chunking and compression of all numeric datasets are
+    chosen anew, and encoded payloads that the policy wants stored as byte
+    arrays (see StoragePolicy.as_bytes) are converted and compressed,
+    otherwise every dataset keeps its storage options. Data are streamed, so
+    memory usage stays bounded (see h5obj.copying).
+
+    Return a Report with the sizes of input and output file (in bytes), the
+    number of bytes reclaimed and the runtime (in seconds).
+    """
+    if policy is True:
+        policy = _policy.StoragePolicy()
+    start = time.time()
+    input_size = os.path.getsize(filename)
+    if output is None:
+        fd, target = tempfile.mkstemp(
+            suffix='.h5', prefix='.'+os.path.basename(filename)+'.',
+            dir=os.path.dirname(os.path.abspath(filename)))
+        os.close(fd)
+    else:
+        target = output
+    try:
+        with h5py.File(filename, 'r') as src, h5py.File(target, 'w') as dst:
+            _repack_group(src, dst, policy, stream_size, {})
+        if output is None:
+            shutil.copymode(filename, target)
+            os.replace(target, filename)
+    except BaseException:
+        if output is None and os.path.exists(target):
+            os.remove(target)
+        raise
+    output_size = os.path.getsize(filename if output is None else output)
+    return Report(input_size, output_size, input_size-output_size,
+                  time.time()-start)
+
+
+def _repack_group(source, dest, policy, stream_size, copied):
+    """Copy the attributes and all members of the h5py group "source" into
+    the h5py group "dest". Objects that are linked more than once are copied
+    only once ("copied" maps objects to their new paths).
+    """
+    copying.copy_attrs(source, dest)
+    for name in source:
+        if copying.copy_link(source, dest, name):
+            continue
+        obj = source[name]
+        if obj.id in copied:
+            dest[name] = dest.file[copied[obj.id]]  # hard link
+            continue
+        copied[obj.id] = posixpath.join(dest.name, name)
+        if isinstance(obj, h5py.Group):
+            _repack_group(obj, copying.create_group_like(obj, dest, name),
+                          policy, stream_size, copied)
+            continue
+        if policy is not None and _repack_payload(obj, dest, name, policy):
+            continue
+        kwargs = None
+        if policy is not None and obj.dtype.kind in 'biufc':
+            kwargs = policy.storage_kwargs(obj.shape, obj.dtype) \
+                or dict(chunks=None)
+        if kwargs is None:
+            copying.copy(obj, dest, name, stream_size=stream_size)
+        else:
+            copying.copy_dataset(obj, dest, name, **kwargs)
+
+
+def _repack_payload(dset, dest, name, policy):
+    """Copy the h5py dataset "dset" into the h5py group "dest" as compressed
+    byte array if it holds an encoded payload stored as string which the
+    given policy wants stored as byte array. Return True if the dataset was
+    copied, False if it has to be copied otherwise. The type tag stays the
+    same, as payloads are decoded from strings and byte arrays alike.
+    """
+    if dset.shape != () or dset.dtype.kind not in 'OS':
+        return False
+    tag = read_tag(dset)
+    if tag is None or codecs.for_tag(tag) is None:
+        return False
+    data = dset[()]
+    if not isinstance(data, (bytes, str)) or not policy.as_bytes(data):
+        return False
+    data = _policy.to_bytes(data)
+    target = dest.create_dataset(name, data=data,
+                                 **policy.dataset_kwargs(data))
+    copying.copy_attrs(dset, target)
+    return True
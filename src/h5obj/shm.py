@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Share a read-only snapshot of a subtree of an h5obj file between processes,
+using a single segment of shared memory.
+
+The snapshot is created once: numpy arrays are read directly into the shared
+memory, all other objects are decoded and stored in serialized (pickled)
+form. Worker processes attach to the snapshot by its name and get a
+read-only mapping with the interface of h5obj.Group. Arrays are returned as
+zero-copy, read-only views on the shared memory, so memory use does not grow
+with the number of workers. Other objects are deserialized on every access
+(each access returns a fresh copy).
+
+Example:
+
+    >>> import h5obj
+    >>> from h5obj import shm
+    >>> with h5obj.File('data.h5', 'r') as f:
+    ...     snapshot = shm.create(f, 'results')
+    >>> # in the workers:
+    >>> results = shm.attach(snapshot.name)
+    >>> results['run42/energy']
+    >>> # when all workers are done:
+    >>> snapshot.unlink()
+
+The creating process owns the segment and should unlink it when it is not
+needed any more (it is unlinked at exit at the latest). Only attach to
+snapshots of trusted processes, as objects are stored using pickle.
+"""
+
+import atexit
+import collections.abc
+import pickle
+import posixpath
+import struct
+
+import h5obj
+from h5obj import index as _index
+from h5obj import lazyimport
+from h5obj.tags import NATIVE, NDARRAY, SERIES, DICT
+numpy = lazyimport.module('numpy')
+
+MAGIC = b'H5OBJSHM'
+ALIGNMENT = 64
+
+# kinds of the entries of a snapshot
+GROUP = _index.GROUP
+ARRAY = 'array'
+OBJECT = 'object'
+
+_HEADER = struct.Struct('<8sQQ')  # magic, offset and size of the entries
+_DATA_OFFSET = ALIGNMENT
+
+
+def create(source, path='/', name=None):
+    """Create a snapshot of the given group of the given h5obj.Group (or
+    h5obj.File, or name of an HDF5 file) in shared memory. "name" is the name
+    of the segment (default: chosen by the system). Return the Snapshot,
+    owning the segment.
+    """
+    if isinstance(source, str):
+        with h5obj.File(source, 'r') as f:
+            return create(f, path=path, name=name)
+    h5file = source.h5group.file
+    root = source._path(path)
+    if source.kind(path) != _index.GROUP:
+        raise TypeError('"%s" is not a group' % root)
+    reader = h5obj.Group(h5file, codec=source.codec)
+
+    # lay out all values, keeping only the serialized objects in memory
+    entries = {'/': (GROUP, [])}
+    arrays = []
+    objects = []
+    size = _DATA_OFFSET
+    for abspath, entry in _index.iterentries(h5file, root, recursive=True):
+        relpath = '/'+abspath[len(root):].lstrip('/')
+        parent = entries.get(posixpath.dirname(relpath))
+        if parent is None or parent[0] != GROUP:
+            continue  # member of a dictionary stored as tree
+        dset = h5file[abspath] if entry.kind == _index.DATASET else None
+        if entry.kind == _index.GROUP and entry.tag != DICT:
+            entries[relpath] = (GROUP, [])
+        elif dset is not None and _is_array(entry, dset):
+            size = _align(size)
+            entries[relpath] = (ARRAY, size, dset.shape, dset.dtype)
+            arrays.append((abspath, size))
+            size += dset.size*dset.dtype.itemsize
+        elif entry.kind != _index.LINK:
+            data = pickle.dumps(reader[abspath], pickle.HIGHEST_PROTOCOL)
+            entries[relpath] = (OBJECT, size, len(data))
+            objects.append((size, data))
+            size += len(data)
+        else:
+            continue
+        parent[1].append(posixpath.basename(relpath))
+    table = pickle.dumps(entries, pickle.HIGHEST_PROTOCOL)
+
+    from multiprocessing import shared_memory
+    segment = shared_memory.SharedMemory(name=name, create=True,
+                                         size=size+len(table))
+    _untrack(segment)
+    snapshot = Snapshot(segment, entries, owner=True)
+    try:
+        buf = segment.buf
+        _HEADER.pack_into(buf, 0, MAGIC, size, len(table))
+        buf[size:size+len(table)] = table
+        for offset, data in objects:
+            buf[offset:offset+len(data)] = data
+        for abspath, offset in arrays:
+            dset = h5file[abspath]
+            if dset.size:
+                target = numpy.ndarray(dset.shape, dset.dtype, buf, offset)
+                dset.read_direct(target)
+                del target
+        del buf
+    except BaseException:
+        snapshot.unlink()
+        raise
+    return snapshot
+
+
+def attach(name):
+    """Attach to the snapshot with the given name (created by another process
+    using create()). Return the Snapshot.
+    """
+    from multiprocessing import shared_memory
+    segment = shared_memory.SharedMemory(name=name)
+    _untrack(segment)
+    magic, offset, size = _HEADER.unpack_from(segment.buf, 0)
+    if magic != MAGIC:
+        segment.close()
+        raise ValueError('shared memory "%s" is not an h5obj snapshot' % name)
+    entries = pickle.loads(segment.buf[offset:offset+size])
+    return Snapshot(segment, entries)
+
+
+def _is_array(entry, dset):
+    """Check if the given dataset (with the given index Entry) is read as a
+    numpy array that can be placed into shared memory as it is.
+    """
+    if dset.dtype.hasobject or not dset.shape:
+        return False
+    if entry.tag in (NDARRAY, SERIES):
+        return True
+    return entry.tag in (NATIVE, None) and dset.dtype.kind in 'biufc'
+
+
+def _align(offset):
+    return (offset+ALIGNMENT-1)//ALIGNMENT*ALIGNMENT
+
+
+def _untrack(segment):
+    """Keep the resource tracker of this process from unlinking the segment
+    when the process exits (the owner unlinks it explicitly). Workers
+    forked by the owner share its resource tracker, so all processes have to
+    untrack the segment to keep the registrations balanced.
+    """
+    from multiprocessing import resource_tracker
+    resource_tracker.unregister(segment._name, 'shared_memory')
+
+
+class SnapshotGroup(collections.abc.Mapping):
+    """Read-only view of a group of a snapshot, with the mapping interface of
+    h5obj.Group. Arrays are returned as read-only views on the shared memory,
+    other objects are deserialized.
+    """
+    def __init__(self, snapshot, path):
+        self.snapshot = snapshot
+        self.path = path
+
+    def _path(self, key):
+        return posixpath.normpath(posixpath.join(self.path, key))
+
+    def kind(self, name):
+        """Return the kind of the object with the given name ("group" or
+        "dataset"), or None if it does not exist.
+        """
+        entry = self.snapshot._entries.get(self._path(name))
+        if entry is None:
+            return None
+        return _index.GROUP if entry[0] == GROUP else _index.DATASET
+
+    def __getitem__(self, key):
+        path = self._path(key)
+        entry = self.snapshot._entries.get(path)
+        if entry is None:
+            raise KeyError(key)
+        return self.snapshot._value(path, entry)
+
+    def __iter__(self):
+        return iter(self.snapshot._entries[self.path][1])
+
+    def __len__(self):
+        return len(self.snapshot._entries[self.path][1])
+
+    def __contains__(self, key):
+        return self._path(key) in self.snapshot._entries
+
+    def __repr__(self):
+        return '<h5obj snapshot group "%s" (%i members)>' % (self.path,
+                                                            len(self))
+
+
+class Snapshot(SnapshotGroup):
+    """Snapshot of a group of an h5obj file in shared memory (the root group
+    of the snapshot), see create() and attach(). "name" is the name of the
+    segment, to be passed to attach(). Use as context manager to close the
+    snapshot when leaving the with-block.
+    """
+    def __init__(self, segment, entries, owner=False):
+        SnapshotGroup.__init__(self, self, '/')
+        self.segment = segment
+        self.owner = owner
+        self._entries = entries
+        if owner:
+            atexit.register(self.unlink)
+
+    @property
+    def name(self):
+        return self.segment.name
+
+    @property
+    def nbytes(self):
+        return self.segment.size
+
+    def _value(self, path, entry):
+        kind = entry[0]
+        if kind == GROUP:
+            return SnapshotGroup(self, path)
+        buf = self.segment.buf
+        if kind == ARRAY:
+            offset, shape, dtype = entry[1:]
+            # unlike numpy.ndarray(), numpy.frombuffer() holds on to the
+            # buffer, so the mapping cannot be closed while the view exists
+            value = numpy.frombuffer(buf, dtype, int(numpy.prod(shape)),
+                                     offset).reshape(shape)
+            value.flags.writeable = False
+            return value
+        offset, size = entry[1:]
+        return pickle.loads(buf[offset:offset+size])
+
+    def close(self):
+        """Detach from the shared memory. Arrays still referenced keep their
+        mapping alive until they are garbage-collected.
+        """
+        try:
+            self.segment.close()
+        except BufferError:
+            pass
+
+    def unlink(self):
+        """Close the snapshot and remove the segment (only the owner does
+        that), so that the memory is released once all processes have
+        detached.
+        """
+        if not self.owner:
+            return
+        self.owner = False
+        atexit.unregister(self.unlink)
+        self.close()
+        from multiprocessing import resource_tracker
+        # SharedMemory.unlink() unregisters the segment
+        resource_tracker.register(self.segment._name, 'shared_memory')
+        try:
+            self.segment.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if self.owner:
+            self.unlink()
+        else:
+            self.close()
+
+    def __repr__(self):
+        return '<h5obj snapshot "%s" (%i bytes)>' % (self.name, self.nbytes)
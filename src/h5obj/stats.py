@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Define opt-in statistics of h5obj files: operation counts, bytes read and
+written, and the time spent in HDF5 I/O versus encoding and decoding. Hooks
+receive every recorded event, e.g. to feed an external profiler.
+
+Example:
+
+    >>> import h5obj
+    >>> with h5obj.File('data.h5', 'a', stats=True) as f:
+    ...     f['results'] = results
+    ...     f['results']
+    ...     print(f.stats)
+    <h5obj stats: decode 1 (0.000012 s), encode 1 (1200 bytes, ...), ...>
+
+Recorded operations ("op" of the events):
+
+- "read", "write": HDF5 I/O of a dataset (bytes and seconds)
+- "encode", "decode": conversion by a codec (bytes and seconds)
+- "dedup": a value has been hard-linked to an identical one (see
+  h5obj.dedup) instead of being written
+- "delete": an object has been deleted
+- "rewrite": an existing object has been replaced (e.g. in a transaction)
+- "legacy": an untagged dataset has been decoded heuristically
+- "fallback": an untagged dataset could not be decoded as json, so its raw
+  value has been returned
+
+Statistics are only collected if enabled, otherwise h5obj does not even take
+the time.
+"""
+
+import collections
+import contextlib
+import time
+
+timer = time.perf_counter
+
+Event = collections.namedtuple('Event', 'op path nbytes seconds')
+
+
+class Stats(object):
+    """Statistics of the operations of an h5obj file (shared by all its
+    groups). "counts", "nbytes" and "seconds" map operations to the number of
+    events, bytes and seconds. "hooks" is a list of callables that are
+    called with every Event.
+    """
+    def __init__(self):
+        self.hooks = []
+        self.reset()
+
+    def reset(self):
+        """Set all counters to zero (the hooks are kept).
+        """
+        self.counts = collections.Counter()
+        self.nbytes = collections.Counter()
+        self.seconds = collections.Counter()
+
+    def record(self, op, path=None, nbytes=0, seconds=0.0):
+        """Record an event of the given operation and pass it on to the
+        hooks.
+        """
+        self.counts[op] += 1
+        if nbytes:
+            self.nbytes[op] += nbytes
+        if seconds:
+            self.seconds[op] += seconds
+        if self.hooks:
+            event = Event(op, path, nbytes, seconds)
+            for hook in self.hooks:
+                hook(event)
+
+    @contextlib.contextmanager
+    def hook(self, func):
+        """Context manager calling the given function with every event
+        recorded inside the with-block.
+        """
+        self.hooks.append(func)
+        try:
+            yield self
+        finally:
+            self.hooks.remove(func)
+
+    @property
+    def bytes_read(self):
+        return self.nbytes['read']
+
+    @property
+    def bytes_written(self):
+        return self.nbytes['write']
+
+    @property
+    def io_seconds(self):
+        """Time spent in HDF5 I/O.
+        """
+        return self.seconds['read']+self.seconds['write']
+
+    @property
+    def codec_seconds(self):
+        """Time spent in encoding and decoding.
+        """
+        return self.seconds['encode']+self.seconds['decode']
+
+    def as_dict(self):
+        """Return all counters as dictionary (e.g. to be stored as json).
+        """
+        return dict(counts=dict(self.counts), nbytes=dict(self.nbytes),
+                    seconds=dict(self.seconds))
+
+    def __repr__(self):
+        parts = []
+        for op in sorted(self.counts):
+            details = []
+            if self.nbytes[op]:
+                details.append('%i bytes' % self.nbytes[op])
+            if self.seconds[op]:
+                details.append('%.6f s' % self.seconds[op])
+            parts.append('%s %i%s' % (op, self.counts[op],
+                                      ' (%s)' % ', '.join(details)
+                                      if details else ''))
+        return '<h5obj stats: %s>' % (', '.join(parts) or 'nothing recorded')
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Define the type tags that h5obj stores with every object it writes
+(attribute "h5obj_type"), recording how the object was stored, and fast
+low-level functions to read and write them.
+"""
+
+from h5obj import codecs, lazyimport
+h5py = lazyimport.module('h5py')
+numpy = lazyimport.module('numpy')
+
+# storage strategies, chosen from the type of the object before writing, and
+# stored as type tag (attribute TAG_ATTR) with every dataset, so that reading
+# can dispatch on the tag instead of guessing
+TAG_ATTR = 'h5obj_type'
+NATIVE = 'native'
+NDARRAY = 'ndarray'
+LIST = 'list'
+TUPLE = 'tuple'
+ENCODED = 'encoded'  # tagged with the tag of the codec, e.g. "json"
+JSON = codecs.JSON
+
+# resizable datasets that records are appended to (see Group.append): series
+# of numeric records are tagged SERIES, series of encoded objects (one payload
+# per record) are tagged SERIES_PREFIX plus the tag of the codec, e.g.
+# "series:json"
+SERIES = 'series'
+SERIES_PREFIX = SERIES + ':'
+
+# groups holding a dictionary stored as tree (see Group option "tree"), one
+# member per key
+DICT = 'dict'
+
+
+def read_tag(obj):
+    """Return the type tag of the given h5py object (or object identifier),
+    or None if it has none. Use the low-level API, which is considerably
+    faster than "obj.attrs.get(TAG_ATTR)".
+    """
+    if isinstance(obj, h5py.HLObject):
+        obj = obj.id
+    try:
+        attr = h5py.h5a.open(obj, _TAG_NAME)
+    except KeyError:
+        return None
+    buf = numpy.empty((), dtype=attr.dtype)
+    attr.read(buf)
+    tag = buf[()]
+    return tag.decode() if isinstance(tag, bytes) else tag
+
+
+def write_tag(obj, tag):
+    """Attach the given type tag to the given h5py object (which must not
+    have a tag yet), using the low-level API.
+    """
+    global _tag_dtype, _tag_type, _tag_space
+    if _tag_type is None:
+        _tag_dtype = h5py.string_dtype()
+        _tag_type = h5py.h5t.py_create(_tag_dtype, logical=True)
+        _tag_space = h5py.h5s.create(h5py.h5s.SCALAR)
+    attr = h5py.h5a.create(obj.id, _TAG_NAME, _tag_type, _tag_space)
+    attr.write(numpy.array(tag, dtype=_tag_dtype))
+
+
+_TAG_NAME = TAG_ATTR.encode()
+_tag_dtype = _tag_type = _tag_space = None
@@ -25,28 +25,92 @@
 recognizing native Python objects that have been stored inside HDF5 files
 using strings in the json format.
 
-With the comliner package (optional dependency) and some additional
-configuration steps, these tools can also be used as command line tools.
+With the comliner package (optional dependency), these tools can also be
+used as command line tools. All of them share the entry point main(), which
+selects the tool by the name of the executable (e.g. "h5ll"), or by the first
+argument (e.g. "h5obj ls").
+
+Heavy dependencies (h5py, numpy, cofunc, columnize, comliner) are imported
+only when a tool actually needs them, to keep the startup of the command line
+tools fast.
 """
 
+import ast
+import collections
 import fnmatch
 import glob
+import hashlib
+import json
 import os
+import posixpath
 import sys
-from columnize import columnize
-import numpy
-import cofunc
+import tempfile
 
 import h5obj
-from h5obj import dummy
+from h5obj import copying, dedup, index, lazyimport, parallel, repack
+h5py = lazyimport.module('h5py')
+
+_commands = {}  # name -> (function, keyword arguments for Comliner)
+_wrapping = set()
 
-try:
+
+def _command(**kwargs):
+    """Declare the decorated function as command line tool. The Comliner
+    wrapper (see package comliner) is created on first access of the module
+    attribute of the same name with a leading underscore (e.g. "_h5ls"), so
+    that comliner is only imported when a command line tool is run.
+    """
+    def decorator(func):
+        _commands[func.__name__] = func, kwargs
+        return func
+    return decorator
+
+
+def __getattr__(name):
+    command = _commands.get(name[1:]) if name.startswith('_') else None
+    if command is None or name in _wrapping:
+        raise AttributeError('module %r has no attribute %r'
+                             % (__name__, name))
     from comliner import Comliner
-except ImportError:
-    Comliner = dummy.Decorator
+    func, kwargs = command
+    _wrapping.add(name)
+    try:
+        Comliner(**kwargs)(func)  # adds the wrapper to this module
+    finally:
+        _wrapping.discard(name)
+    return globals()[name]
 
 
-@Comliner(shortopts=dict(dtype='t', dlen='l', dmax='m', dmin='n'),
+def main():
+    """Run the command line tool selected by the name of the executable (the
+    console scripts point here), or by the first argument, with or without the
+    prefix "h5" (e.g. "h5obj ls file.h5"). Return exit status. There are no
+    console scripts for h5ls, h5mkgrp and h5repack, as they would shadow the
+    HDF5 utilities of the same names.
+    """
+    name = os.path.basename(sys.argv[0])
+    if name not in _commands:
+        if len(sys.argv) < 2:
+            print('usage: h5obj COMMAND [ARGUMENTS]\ncommands: %s'
+                  % ' '.join(sorted(_commands)), file=sys.stderr)
+            return 2
+        name = sys.argv[1]
+        if name not in _commands:
+            name = 'h5'+name
+        if name not in _commands:
+            print(f'h5obj: unknown command "{sys.argv[1]}"', file=sys.stderr)
+            return 2
+        sys.argv = [posixpath.join(os.path.dirname(sys.argv[0]) or '.',
+                                   name)] + sys.argv[2:]
+    try:
+        wrapper = getattr(sys.modules[__name__], '_'+name)
+    except ImportError as error:
+        print(f'{name}: the command line tools require the package "comliner" ({error})', file=sys.stderr)
+        return 1
+    return wrapper()
+
+
+@_command(shortopts=dict(dtype='t', dlen='l', dmax='m', dmin='n'),
       optdoc=dict(dtype='return datatype of the object',
                   dlen='return length of the object',
                   x='return argument "x" of the object',
@@ -58,13 +122,42 @@ except ImportError:
                   attrs='return argument "attrs" of the object',
                   var='return attribute "var" as a coFunc object',
                   stderr='return "sqrt(var/count)" as a coFunc object, ' +
-                         'where "var" and "count" are attributes'),
-      opttypes=dict(item=int, call=float))
+                         'where "var" and "count" are attributes',
+                  jobs='load all datasets matching the pattern, using the ' +
+                       'given number of processes',
+                  to_ndjson='write all datasets matching the pattern to ' +
+                            'stdout as lines {"path": ..., "value": ...} ' +
+                            '(pattern "-": read patterns from stdin)'),
+      opttypes=dict(item=int, call=float, jobs=int))
 def h5load(fdpath, dtype=False, dlen=False, x=False, y=False, attrs=False,
            item=None, call=None, dmax=False, dmin=False, var=False,
-           stderr=False):
-    """Load a dataset from an HDF5 file.
+           stderr=False, jobs=0, to_ndjson=False):
+    """Load a dataset from an HDF5 file. With "jobs", load all datasets
+    matching the given pattern in parallel and return list of pairs of
+    combined path and result (files in sorted order).
+    With "to_ndjson", write all datasets matching the given pattern(s) to
+    stdout in NDJSON format (see h5load_ndjson).
     """
+    options = dict(dtype=dtype, dlen=dlen, x=x, y=y, attrs=attrs, item=item,
+                   call=call, dmax=dmax, dmin=dmin, var=var, stderr=stderr)
+    if to_ndjson:
+        patterns = [line.strip() for line in sys.stdin] if fdpath == '-' \
+            else [fdpath]
+        if not h5load_ndjson([pattern for pattern in patterns if pattern],
+                             sys.stdout, **options):
+            print(f'h5load: cannot load "{fdpath}": no such dataset', file=sys.stderr)
+            sys.exit(1)
+        return None
+    if jobs:
+        paths = ['%s/%s' % (filename, name)
+                 for filename, names in _glob_kinds(fdpath)
+                 for name, kind in names if kind == index.DATASET]
+        if not paths:
+            print(f'h5load: cannot load "{fdpath}": no such dataset', file=sys.stderr)
+            sys.exit(1)
+        values = parallel.load(paths, jobs=jobs)
+        return [(path, _h5load_result(data, **options))
+                for path, data in zip(paths, values)]
     filename, dsetname = h5split(fdpath)
     if not os.path.isfile(filename):
         print(f'h5load: cannot load "{fdpath}": no such file or directory', file=sys.stderr)
@@ -76,6 +169,14 @@ def h5load(fdpath, dtype=False, dlen=False, x=False, y=False, attrs=False,
     if not found:
         print(f'h5load: cannot load "{fdpath}": no such dataset', file=sys.stderr)
         sys.exit(1)
+    return _h5load_result(data, **options)
+
+
+def _h5load_result(data, dtype=False, dlen=False, x=False, y=False,
+                   attrs=False, item=None, call=None, dmax=False, dmin=False,
+                   var=False, stderr=False):
+    """Apply the options of h5load to the loaded data.
+    """
     if dtype:
         data = type(data)
     if x:
@@ -89,6 +190,8 @@ def h5load(fdpath, dtype=False, dlen=False, x=False, y=False, attrs=False,
     elif stderr:
         var = data.attrs.var
         count = data.attrs.count
+        import numpy
+        import cofunc
         stderr = numpy.sqrt(var/count)
         data = cofunc.coFunc(data.x, stderr)
     if item is not None:
@@ -104,117 +207,308 @@ def h5load(fdpath, dtype=False, dlen=False, x=False, y=False, attrs=False,
     return data
 
 
-optdoc = dict(force='overwrite existing datasets', data='data to save')
+NDJSON_BATCH_SIZE = 1000
 
 
-@Comliner(optdoc=optdoc, opttypes=dict(data=str), preproc=dict(data=eval))
-def h5save(fdpath, data=None, force=False):
-    """Save a dataset to an HDF5 file.
+def h5load_ndjson(patterns, output, **options):
+    """Write all datasets matching the given combined filename/dataset
+    patterns to the given text stream, one line {"path": ..., "value": ...}
+    per dataset (values that json cannot represent are converted to lists or
+    strings). The lines are grouped by file, and each file is opened only
+    once. The options of h5load are applied to each value. Return the number
+    of datasets written.
     """
-    filename, dsetname = h5split(fdpath)
-    if not filename and fdpath.count('/'):
-        filename, dsetname = dsetname.split('/', 1)
+    byfile = collections.OrderedDict()
+    for pattern in patterns:
+        for filename, names in _glob_kinds(pattern):
+            byfile.setdefault(filename, []).extend(
+                name for name, kind in names if kind == index.DATASET)
+    count = 0
+    for filename, dsetnames in byfile.items():
+        with h5obj.File(filename, 'r') as f:
+            for start in range(0, len(dsetnames), NDJSON_BATCH_SIZE):
+                batch = dsetnames[start:start+NDJSON_BATCH_SIZE]
+                lines = []
+                for dsetname, data in zip(batch, f.get_many(batch)):
+                    data = _h5load_result(data, **options)
+                    lines.append(json.dumps(
+                        dict(path='%s/%s' % (filename, dsetname),
+                             value=data), default=_to_json) + '\n')
+                output.writelines(lines)
+                count += len(lines)
+    output.flush()
+    return count
+
+
+def _to_json(obj):
+    """Convert objects that json cannot represent (numpy arrays and scalars,
+    bytes, complex numbers, ...) for h5load_ndjson.
+    """
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', 'replace')
+    if isinstance(obj, (tuple, set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def _parse_value(text):
+    """Parse the data given to h5save on the command line: as json if
+    possible, otherwise as Python literal (e.g. tuples, complex numbers,
+    bytes), otherwise take it as string. Never evaluates any code.
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return text
+
+
+optdoc = dict(force='overwrite existing datasets',
+              data='data to save (json or Python literal, otherwise string)',
+              from_ndjson='read lines {"path": ..., "value": ...} from ' +
+                          'stdin and save all of them (paths are dataset ' +
+                          'names inside the given file, if any)')
+
+
+@_command(optdoc=optdoc, opttypes=dict(data=str),
+          preproc=dict(data=_parse_value))
+def h5save(fdpath='', data=None, force=False, from_ndjson=False):
+    """Save a dataset to an HDF5 file. With "from_ndjson", save all values
+    read from stdin in NDJSON format (see h5save_ndjson).
+    """
+    if from_ndjson:
+        h5save_ndjson(sys.stdin, force=force, filename=fdpath or None)
+        return
+    filename, dsetname = _split_save_path(fdpath)
     if not filename or not dsetname:
         print('h5save1: no dataset name specified', file=sys.stderr)
         sys.exit(1)
-    if os.path.isfile(filename):
-        with h5obj.File(filename, 'r') as f:
-            found = dsetname in f
-    else:
-        found = False
-    if found and not force:
-        print('h5save1: cannot save "{fdpath}": dataset exists', file=sys.stderr)
-        sys.exit(1)
     with h5obj.File(filename, 'a') as f:
+        found = dsetname in f
+        if found and not force:
+            print(f'h5save1: cannot save "{fdpath}": dataset exists', file=sys.stderr)
+            sys.exit(1)
         if found:
             del f[dsetname]
         f[dsetname] = data
 
 
-@Comliner(postproc=columnize)
-def h5ls(fdpath):  # long=False (list objtype, datatype and maybe data)
+def h5save_ndjson(lines, force=False, filename=None):
+    """Save the values given as lines {"path": ..., "value": ...} of NDJSON
+    (e.g. a text stream). "path" is a combined filename/dataset path, or a
+    dataset name inside "filename" if that is given. Each file is opened only
+    once, and the values are written in batches of NDJSON_BATCH_SIZE lines
+    (repeated paths within a batch are written once, with the last value).
+    Existing datasets are replaced only if "force" is True. Return the number
+    of values saved.
+    """
+    files = {}
+    count = 0
+    try:
+        batch = []
+        for lineno, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                path, value = record['path'], record['value']
+            except (ValueError, TypeError, KeyError):
+                print(f'h5save: line {lineno}: expecting {{"path": ..., "value": ...}}', file=sys.stderr)
+                sys.exit(1)
+            batch.append((path, value))
+            if len(batch) >= NDJSON_BATCH_SIZE:
+                count += _save_batch(batch, files, force, filename)
+                batch = []
+        count += _save_batch(batch, files, force, filename)
+    finally:
+        for f in files.values():
+            f.close()
+    return count
+
+
+def _save_batch(batch, files, force, filename):
+    """Write a batch of (path, value) pairs, opening files on first use.
+    Return the number of values written.
+    """
+    byfile = collections.OrderedDict()
+    for path, value in batch:
+        if filename is not None:
+            split = filename, path.strip('/')
+        else:
+            split = _split_save_path(path)
+        if not split[0] or not split[1]:
+            print(f'h5save: cannot save "{path}": no dataset name specified', file=sys.stderr)
+            sys.exit(1)
+        byfile.setdefault(split[0], collections.OrderedDict())[split[1]] = \
+            value
+    for name, values in byfile.items():
+        f = files.get(name)
+        if f is None:
+            f = files[name] = h5obj.File(name, 'a')
+        existing = [dsetname for dsetname in values if dsetname in f]
+        if existing and not force:
+            print(f'h5save: cannot save "{name}/{existing[0]}": dataset exists', file=sys.stderr)
+            sys.exit(1)
+        for dsetname in existing:
+            del f[dsetname]
+        f.set_many(values)
+    return sum(len(values) for values in byfile.values())
+
+
+def _split_save_path(fdpath):
+    """Split the combined filename/dataset path of a dataset to be saved. The
+    file does not need to exist yet, then the first component of the path
+    that is not an existing directory is taken as filename.
+    """
+    filename, dsetname = h5split(fdpath)
+    if os.path.isfile(filename):
+        return filename, dsetname
+    parts = fdpath.split('/')
+    for i in range(1, len(parts)+1):
+        head = '/'.join(parts[:i])
+        if head and not os.path.isdir(head):
+            return head, '/'.join(parts[i:]).strip('/')
+    return '', ''
+
+
+def _columnize(names):
+    """Columnize the given list of names (listings that have been printed
+    already are passed as None).
+    """
+    if names is None:
+        return None
+    from columnize import columnize
+    return columnize(names)
+
+
+optdoc = dict(long='list kind, h5obj type, dtype, shape, storage size, '
+                   'compression ratio, chunk shape and filters',
+              recursive='list the contents of groups recursively')
+
+
+@_command(postproc=_columnize, optdoc=optdoc)
+def h5ls(fdpath, long=False, recursive=False):
     """List contents of HDF5 files (and groups). Expect combined
-    filename/dataset path. Return list of dataset/group names.
+    filename/dataset path. Return list of dataset/group names. Long and
+    recursive listings are printed line by line instead.
     """
+    if long:
+        return h5ll(fdpath, recursive=recursive)
     filename, dsetname = h5split(fdpath)
     if not os.path.exists(filename):
         _error_fdpath_not_found('h5ls', fdpath)
     if not os.path.isfile(filename):
         _error_not_file('h5ls', filename)
-    with h5obj.File(filename, 'r') as f:
+    with h5obj.File(filename, 'r', index=True) as f:
+        if recursive:
+            kind = f.kind(dsetname or '/')
+            if kind == 'group':
+                prefix = len(posixpath.normpath('/'+dsetname).rstrip('/'))+1
+                for path, entry in index.iterentries(f.h5group,
+                                                     dsetname or '/',
+                                                     recursive=True):
+                    print(path[prefix:])
+                return None
         if not dsetname:
-            contents = f.keys()
+            contents = list(f.keys())
             found = True
         else:
-            found = dsetname in f
+            kind = f.kind(dsetname)
+            found = kind is not None
             if found:
-                obj = f[dsetname]
-                contents = obj.keys() if type(obj) is h5obj.Group \
-                    else [os.path.basename(dsetname)]
+                contents = list(f.index.children(dsetname)) \
+                    if kind == 'group' else [os.path.basename(dsetname)]
     if not found:
         _error_fdpath_not_found('h5ls', fdpath)
     return contents
 
 
-# make a better h5ls instead? at least there should be only one comliner for
-# both cases
-@Comliner(outmap=dict(ALL='#@'))
-def h5ll(fdpath):
-    """List contents of HDF5 files (and groups), along with some information.
-    Expect combined filename/dataset path. Return dict of dict.
+@_command(optdoc=optdoc)
+def h5ll(fdpath, recursive=False):
+    """List contents of HDF5 files (and groups), along with kind, h5obj type,
+    dtype, shape, storage size, compression ratio, chunk shape and filters
+    (the size of variable-length data is shown as "vlen", as it cannot be
+    known without reading the data). Expect combined filename/dataset path. Only metadata are read, and lines
+    are printed as soon as they are available.
     """
-    raise NotImplementedError
     filename, dsetname = h5split(fdpath)
     if not os.path.exists(filename):
-        _error_fdpath_not_found('h5ls', fdpath)
+        _error_fdpath_not_found('h5ll', fdpath)
     if not os.path.isfile(filename):
-        _error_not_file('h5ls', filename)
+        _error_not_file('h5ll', filename)
     with h5obj.File(filename, 'r') as f:
-        if not dsetname:
-            contents = f.keys()
-            found = True
-        else:
-            found = dsetname in f
-            if found:
-                obj = f[dsetname]
-                contents = obj.keys() if type(obj) is h5obj.Group \
-                    else [os.path.basename(dsetname)]
-    if not found:
-        _error_fdpath_not_found('h5ls', fdpath)
-    return contents
+        path = posixpath.normpath('/'+dsetname)
+        entry = index.Index(f.h5group).get(path)
+        if entry is None:
+            _error_fdpath_not_found('h5ll', fdpath)
+        if entry.kind != 'group':
+            print(_long_line(posixpath.basename(path), entry))
+            return None
+        prefix = len(path.rstrip('/'))+1
+        for path, entry in index.iterentries(f.h5group, path,
+                                             recursive=recursive):
+            print(_long_line(path[prefix:], entry))
+    return None
+
+
+def _long_line(name, entry):
+    """Format one line of a long listing.
+    """
+    if entry.kind != 'dataset':
+        return '%-7s %-8s %-10s %-14s %10s %6s %-14s %-20s %s' \
+            % (entry.kind, entry.tag or '-', '-', '-', '-', '-', '-', '-',
+               name)
+    shape = 'x'.join(map(str, entry.shape)) if entry.shape else 'scalar'
+    size = 'vlen' if entry.size is None else _size(entry.size)
+    ratio = '%.1f' % (entry.nbytes/entry.size) if entry.size else '-'
+    chunks = 'x'.join(map(str, entry.chunks)) if entry.chunks else '-'
+    filters = '+'.join(entry.filters) or '-'
+    return '%-7s %-8s %-10s %-14s %10s %6s %-14s %-20s %s' \
+        % (entry.kind, entry.tag or '-', entry.dtype, shape, size, ratio,
+           chunks, filters, name)
 
 
 optdoc = dict(force='never prompt',
               recursive='remove groups and their contents recursively')
 
 
-@Comliner(optdoc=optdoc)
+@_command(optdoc=optdoc)
 def h5rm(fdpattern, force=False, recursive=False):
     """Remove datasets from HDF5 files.
     """
-    fdpaths = h5glob(fdpattern)
-    if not fdpaths:
+    matches = _glob_kinds(fdpattern)
+    if not matches:
         print(f'h5rm: cannot remove "{fdpattern}": no such group or dataset', file=sys.stderr)
         sys.exit(1)
-    for fdpath in fdpaths:
-        filename, dsetname = h5split(fdpath)
-        with h5obj.File(filename, 'r') as f:
-            dsettype = type(f[dsetname])
-        if dsettype is h5obj.Group:
-            if not recursive:
-                print('h5rm: cannot remove "{fdpath}": is a group', file=sys.stderr)
-                sys.exit(1)
-        if not force:
-            typename = 'group' if dsettype is h5obj.Group else 'dataset'
-            message = 'h5rm: remove %s "%s"? ' % (typename, fdpath)
-            answer = raw_input(message).lower()
-            if not answer or not 'yes'.startswith(answer):
-                continue
+    for filename, dsetnames in matches:
+        remove = []
+        for dsetname, kind in dsetnames:
+            fdpath = '%s/%s' % (filename, dsetname)
+            if kind == 'group':
+                if not recursive:
+                    print(f'h5rm: cannot remove "{fdpath}": is a group', file=sys.stderr)
+                    sys.exit(1)
+            if not force:
+                typename = 'group' if kind == 'group' else 'dataset'
+                message = 'h5rm: remove %s "%s"? ' % (typename, fdpath)
+                answer = input(message).lower()
+                if not answer or not 'yes'.startswith(answer):
+                    continue
+            remove.append(dsetname)
+        if not remove:
+            continue
         with h5obj.File(filename, 'r+') as f:
-            del f[dsetname]
+            for dsetname in remove:
+                if dsetname in f:  # may be gone with a removed parent group
+                    del f[dsetname]
 
 
-@Comliner()
+@_command()
 def h5mkgrp(fdpath):  # parents=False
     """Create groups in HDF5 files.
     """
@@ -229,100 +523,173 @@ def h5mkgrp(fdpath):  # parents=False
         f.create_group(grpname)
 
 
-@Comliner()
+@_command()
 def h5rmgrp(fdpattern, ignore_fail_on_non_empty=False):  # parents=False
     """Remove empty groups from HDF5 files.
     """
-    fdpaths = h5glob(fdpattern)
-    if not fdpaths:
+    matches = _glob_kinds(fdpattern)
+    if not matches:
         print(f'h5rmgrp: failed to remove "{fdpattern}": no such group or dataset', file=sys.stderr)
         sys.exit(1)
-    for fdpath in fdpaths:
-        filename, grpname = h5split(fdpath)
-        with h5obj.File(filename, 'r') as f:
-            objtype = type(f[grpname])
-        if objtype is not h5obj.Group:
-            print(f'h5rmgrp: cannot remove "{fdpath}": is a dataset', file=sys.stderr)
-            sys.exit(1)
-        with h5obj.File(filename, 'r') as f:
-            contents = f[grpname].keys()
-        if contents:
-            if ignore_fail_on_non_empty:
-                continue
-            print(f'h5rmgrp: failed to remove "{fdpath}": group not empty', file=sys.stderr)
-            sys.exit(1)
-        with h5obj.File(filename, 'r+') as f:
-            del f[grpname]
+    for filename, grpnames in matches:
+        with h5obj.File(filename, 'r+', index=True) as f:
+            for grpname, kind in grpnames:
+                fdpath = '%s/%s' % (filename, grpname)
+                if kind != 'group':
+                    print(f'h5rmgrp: cannot remove "{fdpath}": is a dataset', file=sys.stderr)
+                    sys.exit(1)
+                if len(f.h5group[grpname]):
+                    if ignore_fail_on_non_empty:
+                        continue
+                    print(f'h5rmgrp: failed to remove "{fdpath}": group not empty', file=sys.stderr)
+                    sys.exit(1)
+                del f[grpname]
 
 
 optdoc = dict(force='overwrite existing datasets',
               recursive='copy groups recursively')
 
 
-@Comliner(optdoc=optdoc)
+@_command(optdoc=optdoc)
 def h5cp(source, dest, force=False, recursive=False):
     """Copy datasets and groups in HDF5 files (or from one HDF5 file to
-    another).
+    another). Objects are copied as they are stored (including attributes,
+    chunking and compression), without decoding them.
     """
     filename, objname = h5split(source)
-    with h5obj.File(filename, 'r') as f:
-        found = objname in f
-        if found:
-            objtype = type(f[objname])
-    if not found:
-        _error_fdpath_not_found(source)
-    destfilename, destobjname = h5split(dest)
-    if objtype is h5obj.Group:
-        if not recursive:
+    if not os.path.isfile(filename):
+        _error_fdpath_not_found('h5cp', source)
+    if not objname.strip('/'):
+        print(f'h5cp: cannot copy "{source}": no group or dataset given', file=sys.stderr)
+        sys.exit(1)
+    objname = posixpath.normpath('/'+objname)
+    destfilename, destobjname = _split_dest(dest)
+    samefile = os.path.isfile(destfilename) \
+        and os.path.samefile(filename, destfilename)
+    if samefile:
+        src = dst = h5obj.File(filename, 'r+')
+    else:
+        src = h5obj.File(filename, 'r')
+        dst = h5obj.File(destfilename, 'a')
+    try:
+        kind = src.kind(objname)
+        if kind is None:
+            _error_fdpath_not_found('h5cp', source)
+        if kind == 'group' and not recursive:
             print(f'h5cp: omitting group "{source}"', file=sys.stderr)
             sys.exit(1)
 
-        # copy group recursively
-        #raise NotImplementedError, 'recursive copy not yet implemented'
-        ### use h5py.File.copy somehow, could be easier
-        dsets = {}
-        with h5obj.File(filename, 'r') as f:
-            g = f[objname]
-            names = []
-            g.visit(names.append)
-            for name in names:
-                if type(g[name]) is not h5obj.Group:
-                    dsets[name] = g[name]
-        with h5obj.File(destfilename, 'a') as f:
-            for name, value in dsets.iteritems():
-                f[destobjname+'/'+objname+'/'+name] = value
-
-    else:
-        data = h5load(source)
-        if os.path.exists(destfilename):
-            with h5obj.File(destfilename, 'r') as f:
-                found = destobjname in f
-                if found:
-                    desttype = type(f[destobjname])
-        else:
-            found = False
-        original_name = objname.split('/')[-1]
-        if found:
-            if desttype is h5obj.Group:
-                # save under the original name into that group
-                h5save(dest+'/'+original_name, data=data, force=force)
-            else:
-                # overwrite that dataset (if force)
-                h5save(dest, data=data, force=force)
+        target, destkind = _target(dst, objname, destobjname)
+        if samefile and (target == objname
+                         or target.startswith(objname+'/')):
+            print(f'h5cp: cannot copy "{source}" into itself', file=sys.stderr)
+            sys.exit(1)
+        if destkind is not None:
+            if not force:
+                print(f'h5cp: cannot copy "{source}": "{destfilename}/{target.lstrip("/")}" exists', file=sys.stderr)
+                sys.exit(1)
+            if destkind == 'group' and kind != 'group':
+                print(f'h5cp: cannot overwrite group "{destfilename}/{target.lstrip("/")}" with dataset', file=sys.stderr)
+                sys.exit(1)
+            del dst[target]
+        parent = dst.h5group.require_group(posixpath.dirname(target))
+        if samefile and dedup.enabled(dst.h5group):
+            copying.link(src.h5group[objname], parent,
+                         posixpath.basename(target))
         else:
-            # save new dataset under the given name (only if group path
-            # exists?)
-            new = dest if dest.count('/') else dest+'/'+original_name
-            h5save(new, data=data, force=force)
+            copying.copy(src.h5group[objname], parent,
+                         posixpath.basename(target))
+    finally:
+        src.close()
+        if not samefile:
+            dst.close()
 
 
-@Comliner()
+@_command()
 def h5mv(source, dest, recursive=False):
     """Move (rename) datasets in HDF5 files (or from one HDF5 file to
-    another).
+    another). Within a file, only the link is moved. Moving to another file
+    copies the object (see h5cp) and removes it afterwards.
     """
-    h5cp(source, dest, recursive=recursive)
-    h5rm(source, force=True, recursive=recursive)
+    filename, objname = h5split(source)
+    destfilename, destobjname = _split_dest(dest)
+    if not os.path.isfile(filename) or not os.path.isfile(destfilename) \
+            or not os.path.samefile(filename, destfilename):
+        h5cp(source, dest, recursive=recursive)
+        h5rm(source, force=True, recursive=recursive)
+        return
+    objname = posixpath.normpath('/'+objname)
+    with h5obj.File(filename, 'r+') as f:
+        kind = f.kind(objname)
+        if kind is None or objname == '/':
+            _error_fdpath_not_found('h5mv', source)
+        if kind == 'group' and not recursive:
+            print(f'h5mv: omitting group "{source}"', file=sys.stderr)
+            sys.exit(1)
+        target, destkind = _target(f, objname, destobjname)
+        if target == objname or target.startswith(objname+'/'):
+            print(f'h5mv: cannot move "{source}" into itself', file=sys.stderr)
+            sys.exit(1)
+        if destkind is not None:
+            print(f'h5mv: cannot move "{source}": "{destfilename}/{target.lstrip("/")}" exists', file=sys.stderr)
+            sys.exit(1)
+        f.move(objname, target)
+
+
+def _target(dst, objname, destobjname):
+    """Return the absolute path of the target of a copy or move, and the kind
+    of the object already existing there (or None). Copying or moving into an
+    existing group keeps the original name.
+    """
+    target = posixpath.normpath('/'+destobjname)
+    destkind = dst.kind(target)
+    if destkind == 'group':
+        target = posixpath.join(target, posixpath.basename(objname))
+        destkind = dst.kind(target)
+    return target, destkind
+
+
+optdoc = dict(output='write to this file instead of replacing the input file',
+              compression='apply a new storage policy using this compression '
+                          '("gzip", "lzf" or "none"), otherwise keep the '
+                          'storage options of each dataset',
+              level='gzip compression level',
+              chunk_size='approximate chunk size in bytes (with new policy)')
+
+
+@_command(optdoc=optdoc)
+def h5repack(filename, output='', compression='', level=4, chunk_size=0):
+    """Rewrite an HDF5 file into a fresh compact file, reclaiming the space
+    of deleted and overwritten datasets. Report sizes and runtime.
+    """
+    if not os.path.isfile(filename):
+        _error_fdpath_not_found('h5repack', filename)
+    policy = None
+    if compression:
+        kwargs = dict(compression=None if compression == 'none'
+                      else compression, compression_opts=level)
+        if chunk_size:
+            kwargs['chunk_size'] = chunk_size
+        try:
+            policy = h5obj.policy.StoragePolicy(**kwargs)
+        except ValueError as error:
+            print(f'h5repack: {error}', file=sys.stderr)
+            sys.exit(1)
+    report = repack.repack(filename, output=output or None, policy=policy)
+    print('%s: %s -> %s, %s reclaimed in %.2f s'
+          % (output or filename, _size(report.input_size),
+             _size(report.output_size), _size(report.reclaimed),
+             report.seconds))
+
+
+def _size(nbytes):
+    """Return the given number of bytes in human-readable form.
+    """
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(nbytes) < 1024 or unit == 'GiB':
+            break
+        nbytes /= 1024
+    return ('%i %s' if unit == 'B' else '%.1f %s') % (nbytes, unit)
 
 
 def h5glob_filewise(fdpattern, unique=False, sort=False):
@@ -331,37 +698,20 @@ def h5glob_filewise(fdpattern, unique=False, sort=False):
     pattern).
     """
     filepattern, dsetpattern = h5split(fdpattern)
-    new_fdpatterns = []
-    filenames = glob.glob(filepattern)
-    filenames.sort()
-    for filename in filenames:
-            new_fdpatterns.append(filename+'/'+dsetpattern)
+    new_fdpatterns = [filename+'/'+dsetpattern
+                      for filename in sorted(_iglob_files(filepattern))]
+    if unique:
+        new_fdpatterns = list(set(new_fdpatterns))
+    if sort:
+        new_fdpatterns.sort()
     return new_fdpatterns
 
-    #dpatterns = {}
-    #for fdpath in h5glob(fdpattern):
-        #filename, dsetname = h5split(fdpath)
-        #if not filename in dpatterns: dpatterns[filename] = []
-        #dpatterns[filename].append(dsetname)
-
 
 def h5glob(fdpattern, unique=False, sort=False):
     """Expand a combined filename/dataset pattern. Return list of single
     combined filename/dataset paths.
     """
-    filepattern, dsetpattern = h5split(fdpattern)
-    if not filepattern:
-        return []
-    #if not dsetpattern: dsetpattern = '*'
-    alldsets = []
-    for filename in glob.glob(filepattern):
-        if not os.path.isfile(filename):
-            raise IOError('"%s" is not a file' % filename)
-        allfiledsets = []
-        with h5obj.File(filename, 'r') as f:
-            f.visit(allfiledsets.append)
-        alldsets += ['%s/%s' % (filename, dsetname)
-                     for dsetname in fnmatch.filter(allfiledsets, dsetpattern)]
+    alldsets = list(h5iglob(fdpattern))
     if unique:
         alldsets = list(set(alldsets))
     if sort:
@@ -369,33 +719,243 @@ def h5glob(fdpattern, unique=False, sort=False):
     return alldsets
 
 
+def h5iglob(fdpattern):
+    """Expand a combined filename/dataset pattern. Return generator of single
+    combined filename/dataset paths.
+
+    The dataset pattern is matched segment by segment, so only groups that
+    match the respective segment are visited. Wildcards do not match across
+    slashes, but a segment "**" matches any number of groups (including none),
+    e.g. "file.h5/run42/**/energy". A trailing "**" matches everything below.
+
+    Matches are yielded while the file is open (it is closed when the
+    generator moves on to the next file or is closed), so do not modify the
+    file before the generator is exhausted or closed.
+    """
+    filepattern, dsetpattern = h5split(fdpattern)
+    if not filepattern:
+        return
+    for filename in _iglob_files(filepattern):
+        with h5py.File(filename, 'r') as f:
+            for dsetname in _iglob_tree(f, dsetpattern):
+                yield '%s/%s' % (filename, dsetname)
+
+
+def _glob_kinds(fdpattern):
+    """Expand a combined filename/dataset pattern. Return list of pairs of
+    filename and list of (name, kind) of all matching objects in that file,
+    sorted by filename. Files without matches are left out.
+    """
+    filepattern, dsetpattern = h5split(fdpattern)
+    if not filepattern:
+        return []
+    matches = []
+    for filename in sorted(_iglob_files(filepattern)):
+        with h5obj.File(filename, 'r', index=True) as f:
+            names = [(name, f.kind(name))
+                     for name in _iglob_tree(f.h5group, dsetpattern)]
+        if names:
+            matches.append((filename, names))
+    return matches
+
+
+def _iglob_files(filepattern):
+    """Expand the filename part of a combined pattern. Raise IOError if a
+    match is not a file.
+    """
+    for filename in glob.iglob(filepattern):
+        if not os.path.isfile(filename):
+            raise IOError('"%s" is not a file' % filename)
+        yield filename
+
+
+def _iglob_tree(h5group, pattern):
+    """Return generator of the paths of all objects below the given h5py
+    group matching the given dataset pattern (relative to the group).
+    """
+    segments = [segment for segment in pattern.split('/') if segment]
+    if segments:
+        yield from _iglob_segments(h5group, segments, '', {h5group.id})
+
+
+def _iglob_segments(h5group, segments, prefix, ancestors):
+    segment, rest = segments[0], segments[1:]
+    if segment == '**':
+        if not rest:
+            yield from _iglob_all(h5group, prefix, ancestors)
+            return
+        yield from _iglob_segments(h5group, rest, prefix, ancestors)
+        for name in _visible(h5group, prefix):
+            child = _subgroup(h5group, name, ancestors)
+            if child is not None:
+                yield from _iglob_segments(child, segments, prefix+name+'/',
+                                           ancestors | {child.id})
+        return
+    if glob.has_magic(segment):
+        names = fnmatch.filter(_visible(h5group, prefix), segment)
+    elif segment in h5group:
+        names = [segment]
+    else:
+        return
+    for name in names:
+        if not rest:
+            yield prefix+name
+            continue
+        child = _subgroup(h5group, name, ancestors)
+        if child is not None:
+            yield from _iglob_segments(child, rest, prefix+name+'/',
+                                       ancestors | {child.id})
+
+
+def _iglob_all(h5group, prefix, ancestors):
+    for name in _visible(h5group, prefix):
+        yield prefix+name
+        child = _subgroup(h5group, name, ancestors)
+        if child is not None:
+            yield from _iglob_all(child, prefix+name+'/',
+                                  ancestors | {child.id})
+
+
+def _visible(h5group, prefix):
+    """Return the names of the members of the given h5py group, leaving out
+    the hidden group of h5obj if it is the root group (empty prefix).
+    """
+    if prefix:
+        return h5group
+    return [name for name in h5group if name != dedup.HIDDEN]
+
+
+def _subgroup(h5group, name, ancestors):
+    """Return the member of the given name if it is a group that is not
+    already on the current path (hard link cycles), otherwise None.
+    """
+    if h5group.get(name, getclass=True) is not h5py.Group:
+        return None
+    child = h5group[name]
+    if child.id in ancestors:
+        return None
+    return child
+
+
 def h5split(pattern):
     """Split a combined filename/dataset pattern into the filename part and the
     dataset part. Return filename pattern and dataset pattern. The given
     pattern must contain at least one slash that devides the filename part from
     the dataset part.
+
+    The filename part is the longest leading part of the pattern that matches
+    something on disk. Splits that end at existing files are cached for the
+    lifetime of the process (see h5split_cache_clear).
     """
-    parts = pattern.split('/')
-    #if len(parts) < 2:
-        #raise ValueError('pattern must contain at least one slash "/"')
-    for mark in xrange(len(parts)):
-        if mark == 0 and not parts[mark]:
-            continue
-        filepattern = '/'.join(parts[:(mark+1)])
-        filenames = glob.glob(filepattern)
-        if len(filenames) == 0:  # if actual_files > 0
-            filepattern = '/'.join(parts[:mark])
-            dsetpattern = '/'.join(parts[mark:])
-            break
-    else:
-        filepattern = '/'.join(parts[:(mark+1)])
-        dsetpattern = '/'.join(parts[(mark+1):])
-    if dsetpattern and not filepattern:
-        filepattern, dsetpattern = dsetpattern, filepattern
-    return filepattern, dsetpattern
+    split = _split_cache.get(pattern)
+    if split is None:
+        split = _PathResolver().split(pattern)
+    return split
+
+
+def h5split_many(patterns):
+    """Split many combined filename/dataset patterns at once. Return list of
+    pairs of filename pattern and dataset pattern (see h5split). Each
+    directory involved is listed only once.
+    """
+    resolver = _PathResolver(listdir=True)
+    splits = []
+    for pattern in patterns:
+        split = _split_cache.get(pattern)
+        if split is None:
+            split = resolver.split(pattern)
+        splits.append(split)
+    return splits
+
+
+def h5split_cache_clear():
+    """Clear the cache of h5split.
+    """
+    _split_cache.clear()
+
+
+_split_cache = {}
+_SPLIT_CACHE_SIZE = 10000
+
+
+class _PathResolver(object):
+    """Resolve combined filename/dataset patterns against the file system,
+    component by component. Literal components are checked with a single
+    stat, only components containing wildcards are globbed. If "listdir" is
+    True, each directory is listed at most once, and all components are
+    looked up in the listings.
+    """
+
+    def __init__(self, listdir=False):
+        self.listdir = listdir
+        self._listings = {}
+
+    def split(self, pattern):
+        parts = pattern.split('/')
+        matches = None
+        for mark in range(len(parts)):
+            if mark == 0 and not parts[mark]:
+                matches = ['']  # absolute path
+                continue
+            found = self._expand(matches, parts[mark])
+            if not found:
+                filepattern = '/'.join(parts[:mark])
+                dsetpattern = '/'.join(parts[mark:])
+                break
+            matches = found
+        else:
+            filepattern = '/'.join(parts)
+            dsetpattern = ''
+        split = filepattern, dsetpattern
+        if dsetpattern and not filepattern:
+            split = dsetpattern, filepattern
+        elif matches and all(os.path.isfile(path) for path in matches):
+            # nothing can appear below a file, so the split is final
+            if len(_split_cache) >= _SPLIT_CACHE_SIZE:
+                _split_cache.clear()
+            _split_cache[pattern] = split
+        return split
+
+    def _expand(self, prefixes, part):
+        """Return list of all existing paths composed of one of the given
+        prefixes (None stands for the current directory, "" for the root
+        directory) and the given component.
+        """
+        found = []
+        for prefix in prefixes or [None]:
+            path = part if prefix is None else prefix+'/'+part
+            if glob.has_magic(part):
+                if self.listdir:
+                    names = fnmatch.filter(self._listing(prefix), part)
+                    if not part.startswith('.'):
+                        names = [name for name in names
+                                 if not name.startswith('.')]
+                    found += [name if prefix is None else prefix+'/'+name
+                              for name in names]
+                else:
+                    dirname = '' if prefix is None \
+                        else glob.escape(prefix)+'/'
+                    found += glob.glob(dirname+part)
+            elif self.listdir and part not in ('', '.', '..'):
+                if part in self._listing(prefix):
+                    found.append(path)
+            elif os.path.lexists(path):
+                found.append(path)
+        return found
 
+    def _listing(self, prefix):
+        dirname = '.' if prefix is None else prefix or '/'
+        names = self._listings.get(dirname)
+        if names is None:
+            try:
+                names = set(os.listdir(dirname))
+            except OSError:
+                names = set()
+            self._listings[dirname] = names
+        return names
 
-@Comliner(outmap={0: '#@'})
+
+@_command(outmap={0: '#@'})
 def h5complete(incompl):
     # check if incompl is a pure file path
     globbed = glob.glob(incompl+'*')
@@ -409,7 +969,7 @@ def h5complete(incompl):
 
     # cycle slashes from back to front, check if the part before the slash is a
     # file
-    for sind in xrange(scount, 0, -1):
+    for sind in range(scount, 0, -1):
         part1, part2 = divide(incompl, '/', sind)
         if os.path.isdir(part1):
             break
@@ -418,18 +978,10 @@ def h5complete(incompl):
 
         # so part1 is a file
         part2a, part2b = divide(part2, '/', -1)
-        try:
-            with h5obj.File(part1, 'r') as f:
-                g = f[part2a] if part2a else f
-                if not type(g) in (h5obj.Group, h5obj.File):
-                    return []
-                grpitems = g.keys()
-                isgrp = {}
-                for grpitem in grpitems:
-                    isgrp[grpitem] = type(g[grpitem]) is h5obj.Group
-        except IOError:
+        isgrp = _complete_members(part1, posixpath.normpath('/'+part2a))
+        if isgrp is None:
             return []
-        filtered = fnmatch.filter(grpitems, part2b+'*')
+        filtered = fnmatch.filter(list(isgrp), part2b+'*')
         if part2a:
             part2a += '/'
         out = []
@@ -442,6 +994,91 @@ def h5complete(incompl):
     return []
 
 
+def _complete_members(filename, grpname):
+    """Return dict mapping the names of the members of the given group to
+    True (for groups) or False, or None if the group does not exist (or the
+    file cannot be read). Group listings are cached on disk (see
+    _completion_cache_file), so repeated completions do not open the file.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    stamp = [os.path.realpath(filename), stat.st_size, stat.st_mtime_ns]
+    cachefile = _completion_cache_file(stamp[0])
+    try:
+        with open(cachefile) as fh:
+            cached = json.load(fh)
+    except (OSError, ValueError):
+        cached = None
+    if not isinstance(cached, dict) or cached.get('stamp') != stamp:
+        cached = dict(stamp=stamp, groups={})
+    members = cached['groups'].get(grpname)
+    if members is None:
+        members = _list_members(filename, grpname)
+        if members is None:
+            return None
+        cached['groups'][grpname] = members
+        _write_cache(cachefile, cached)
+    return members
+
+
+def _list_members(filename, grpname):
+    """List the given group, only reading the object type of each member.
+    """
+    try:
+        with h5py.File(filename, 'r') as f:
+            try:
+                gid = h5py.h5o.open(f.id, grpname.encode())
+            except KeyError:
+                return None
+            if not isinstance(gid, h5py.h5g.GroupID):
+                return None
+            bnames = []
+            gid.links.iterate(bnames.append)
+            members = {}
+            for bname in bnames:
+                try:
+                    isgrp = h5py.h5o.get_info(gid, bname).type \
+                        == h5py.h5o.TYPE_GROUP
+                except (KeyError, RuntimeError):  # dangling link
+                    isgrp = False
+                members[bname.decode('utf-8', 'surrogateescape')] = isgrp
+            return members
+    except OSError:
+        return None
+
+
+def _completion_cache_file(filename):
+    """Return the name of the file caching the group listings of the given
+    HDF5 file (in $XDG_CACHE_HOME/h5obj/complete, or ~/.cache/h5obj/complete).
+    The cache is discarded as soon as size or modification time of the file
+    change.
+    """
+    cachedir = os.environ.get('XDG_CACHE_HOME') \
+        or os.path.join(os.path.expanduser('~'), '.cache')
+    key = hashlib.sha1(filename.encode('utf-8', 'surrogateescape'))
+    return os.path.join(cachedir, 'h5obj', 'complete',
+                        key.hexdigest()+'.json')
+
+
+def _write_cache(cachefile, data):
+    """Write the given data to the given cache file (atomically). Failures
+    are ignored, the cache is just an optimization.
+    """
+    try:
+        os.makedirs(os.path.dirname(cachefile), exist_ok=True)
+        fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(cachefile))
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(data, fh, separators=(',', ':'))
+        os.replace(tmpname, cachefile)
+    except OSError:
+        os.remove(tmpname)
+
+
 def divide(string, char, n):
     """Divide the string at the n-th occurence of char. Return two strings,
     neither including that char.
@@ -457,6 +1094,20 @@ def divide(string, char, n):
     return char.join(part1), char.join(part2)
 
 
+def _split_dest(fdpath):
+    """Split the combined filename/dataset path of a destination. Unlike
+    h5split, the file does not need to exist yet (its directory does).
+    """
+    filename, objname = h5split(fdpath)
+    if os.path.isfile(filename):
+        return filename, objname
+    parts = fdpath.split('/')
+    mark = 1 if len(parts) > 1 and not parts[0] else 0
+    while mark < len(parts)-1 and os.path.isdir('/'.join(parts[:mark+1])):
+        mark += 1
+    return '/'.join(parts[:mark+1]), '/'.join(parts[mark+1:])
+
+
 def _error_fdpath_not_found(prog, fdpath):
     print(f'{prog}: cannot access "{fdpath}": no such group or dataset', file=sys.stderr)
     sys.exit(1)
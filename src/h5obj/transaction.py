@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Define write-buffered transactions on h5obj files (and groups).
+
+Example:
+
+    >>> import h5obj
+    >>> with h5obj.File('data.h5', 'a') as f:
+    ...     with f.transaction() as t:
+    ...         for step in range(1000):
+    ...             t['results/step%i' % step] = compute(step)
+    ...             t['results/last'] = step
+
+All writes, deletes and group creations are kept in memory and applied in a
+single ordered pass (followed by a single flush) when the with-block is left
+normally. If an exception occurs inside the with-block, nothing is written.
+Repeated writes to the same key are coalesced, only the last value is
+written. Inside a transaction, assigning to an existing key replaces it.
+
+Note that HDF5 itself has no journal, so a crash while the buffered operations
+are being applied can still leave the file partly written.
+"""
+
+import collections
+import posixpath
+
+from h5obj import lazyimport
+h5py = lazyimport.module('h5py')
+
+SET = 'set'
+DELETE = 'delete'
+GROUP = 'group'
+
+
+class Transaction(object):
+    """Write buffer for an h5obj.Group (or h5obj.File). Supports item
+    assignment, deletion, lookup, "in", and create_group(). Objects are
+    prepared (strategy, encoding) as soon as they are assigned, so errors
+    are raised at the point of assignment.
+    """
+    def __init__(self, group):
+        self.group = group
+        self._ops = collections.OrderedDict()
+        self._objects = {}
+
+    def _path(self, key):
+        return self.group._path(key)
+
+    def __setitem__(self, key, obj):
+        path = self._path(key)
+        self._check_parents(path)
+        prepared = self.group._prepare(obj)
+        self._discard(path)
+        self._ops[path] = SET, prepared
+        self._objects[path] = obj
+
+    def __delitem__(self, key):
+        path = self._path(key)
+        if path not in self:
+            raise KeyError(key)
+        self._discard(path)
+        if self._on_disk(path):
+            self._ops[path] = DELETE, None
+
+    def create_group(self, name):
+        """Schedule the creation of a group. Raise ValueError if it already
+        exists.
+        """
+        path = self._path(name)
+        if path in self:
+            raise ValueError('unable to create group "%s" (name already '
+                             'exists)' % name)
+        self._check_parents(path)
+        self._ops[path] = GROUP, None
+
+    def require_group(self, name):
+        """Schedule the creation of a group, if it does not exist yet.
+        """
+        path = self._path(name)
+        if path not in self:
+            self._check_parents(path)
+            self._ops[path] = GROUP, None
+
+    def __getitem__(self, key):
+        path = self._path(key)
+        pending = self._pending(path)
+        if pending is not None:
+            op, prepared = self._ops[pending]
+            if op == SET and pending == path:
+                return self._objects[path]
+            if op == DELETE:
+                raise KeyError(key)
+        return self.group[path]
+
+    def __contains__(self, key):
+        path = self._path(key)
+        pending = self._pending(path)
+        if pending is not None:
+            op = self._ops[pending][0]
+            if op == DELETE:
+                return False
+            if pending == path:
+                return True
+            if op == SET:
+                return False
+        return self._on_disk(path)
+
+    def _pending(self, path):
+        """Return the path of the buffered operation affecting the given path
+        (the path itself or its nearest parent), or None.
+        """
+        while True:
+            if path in self._ops:
+                return path
+            if path == '/':
+                return None
+            path = posixpath.dirname(path)
+
+    def _check_parents(self, path):
+        """Raise TypeError if a parent of the given path is (or will be) a
+        dataset, so that conflicts are reported before anything is written.
+        """
+        h5file = self.group.h5group.file
+        deleted = False
+        parents = []
+        while path != '/':
+            path = posixpath.dirname(path)
+            parents.append(path)
+        for parent in reversed(parents[:-1]):
+            op = self._ops.get(parent, (None,))[0]
+            if op == SET:
+                raise TypeError('unable to store below "%s" (dataset is '
+                                'pending)' % parent)
+            if op is not None:
+                deleted = deleted or op == DELETE
+            elif not deleted and h5file.get(parent, getclass=True) \
+                    is h5py.Dataset:
+                raise TypeError('unable to store below "%s" (dataset '
+                                'exists)' % parent)
+
+    def _discard(self, path):
+        """Remove all buffered operations at or below the given path.
+        """
+        prefix = path.rstrip('/')+'/'
+        for other in [other for other in self._ops
+                      if other == path or other.startswith(prefix)]:
+            del self._ops[other]
+            self._objects.pop(other, None)
+
+    def _on_disk(self, path):
+        return path in self.group.h5group.file
+
+    def __len__(self):
+        return len(self._ops)
+
+    def commit(self):
+        """Apply all buffered operations in order, and flush the file.
+        """
+        group = self.group
+        h5file = group.h5group.file
+        for path, (op, prepared) in self._ops.items():
+            if op == DELETE:
+                if path in h5file:
+                    group.__delitem__(path)
+            elif op == GROUP:
+                group.require_group(path)
+            else:
+                if path in h5file:
+                    group.__delitem__(path)
+                    if group.stats is not None:
+                        group.stats.record('rewrite', path)
+                parentname, name = posixpath.split(path)
+                group._store(h5file.require_group(parentname), name, prepared)
+        self.discard()
+        h5file.flush()
+
+    def discard(self):
+        """Throw away all buffered operations.
+        """
+        self._ops.clear()
+        self._objects.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+    def __repr__(self):
+        return '<h5obj transaction on %s: %i pending operations>' \
+            % (self.group.h5group.name, len(self._ops))
@@ -1,4 +1,3 @@
-#!/usr/bin/env python
 # -*- coding: utf-8 -*-
 #
 # Copyright notice
@@ -21,31 +20,36 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
 #
-"""Implement dummies.
+"""Test batched access with Group.set_many and Group.get_many.
 """
 
+import pytest
 
-def function(*args, **kwargs):
-    """Dummy function, returning None.
-    """
-    return
+import h5obj
 
 
-def function1(x, *args, **kwargs):
-    """Dummy function, passing through the first argument.
-    """
-    return x
+@pytest.fixture
+def f(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w') as f:
+        yield f
 
 
-class Class(object):
-    """Dummy class.
-    """
-    def __init__(self, *args, **kwargs):
-        pass
+def test_set_many_get_many(f):
+    f.set_many({'a': 1, 'g/b': [1, 2], 'g/h/c': {'x': None}})
+    assert f.get_many(['g/h/c', 'a', 'g/b']) == [{'x': None}, 1, [1, 2]]
+    assert f.get_many(['missing', 'a'], default=0) == [0, 1]
+    with pytest.raises(KeyError):
+        f.get_many(['missing'])
 
 
-class Decorator(Class):
-    """Dummy decorator, the function stays untouched.
-    """
-    def __call__(self, func, *args, **kwargs):
-        return func
+def test_set_many_is_atomic(f):
+    with pytest.raises(TypeError):
+        f.set_many({'a': 1, 'b': object()})
+    assert 'a' not in f
+
+
+def test_get_many_lazy(f):
+    f.set_many([('a', [1, 2]), ('b', 'x')])
+    f.return_value = 'lazy'
+    lazy = f.get_many(['a', 'b'])
+    assert lazy[0][()] == [1, 2] and lazy[1][()] == 'x'
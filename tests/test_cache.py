@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test the cache of decoded values.
+"""
+
+import h5obj
+from h5obj.cache import ValueCache
+
+
+def test_hits_and_invalidation(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', cache=True) as f:
+        f['g/x'] = {'a': 1}
+        assert f['g/x'] == {'a': 1}
+        assert f['g/x'] == {'a': 1}
+        assert f.cache.hits == 1 and f.cache.misses == 1
+        del f['g/x']
+        f['g/x'] = {'a': 2}
+        assert f['g/x'] == {'a': 2}
+        f.copy('g', 'h')
+        f.move('h/x', 'y')
+        assert f['y'] == {'a': 2}
+
+
+def test_limits():
+    cache = ValueCache(max_entries=2, max_bytes=100)
+    cache.put('/a', 1, 10)
+    cache.put('/b', 2, 10)
+    cache.get('/a')
+    cache.put('/c', 3, 10)
+    assert cache.get('/b') is None and cache.get('/a') == 1
+    cache.put('/big', 4, 1000)
+    assert cache.get('/big') is None
+
+
+def test_invalidate_parents_and_children():
+    cache = ValueCache()
+    for path in ('/g', '/g/x', '/g/x/y', '/other'):
+        cache.put(path, path)
+    cache.invalidate('/g/x')
+    assert cache.get('/g') is None and cache.get('/g/x/y') is None
+    assert cache.get('/other') == '/other'
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test the codec registry and the built-in codecs.
+"""
+
+import enum
+import math
+
+import numpy
+import pytest
+
+import h5obj
+from h5obj import codecs
+from h5obj.tags import TAG_ATTR
+
+VALUES = [None, True, 0, -2**63, 2**64, 2**70, 1.5, 'text', 'äöü', [], {},
+          [1, 2, 3], [1.0, 2.5], [1, 'a', None], {'a': [1, {'b': 2.5}]},
+          [[1, 2], [3.5, None]]]
+
+
+@pytest.mark.parametrize('value', VALUES)
+@pytest.mark.parametrize('name', codecs.available())
+def test_codec_roundtrip(name, value):
+    codec = codecs.get(name)
+    assert codec.decode(codec.encode(value)) == value
+
+
+def test_binary_codec_keeps_types():
+    codec = codecs.get('binary')
+    value = {(1, 2): b'raw', 3: (1.5, 2.5), 'c': 1+2j, 'l': [2**80, -1]}
+    result = codec.decode(codec.encode(value))
+    assert result == value
+    assert type(result[(1, 2)]) is bytes
+    assert type(result[3]) is tuple
+
+
+def test_binary_codec_accepts_subclasses():
+    class Color(enum.IntEnum):
+        RED = 3
+
+    class Name(str):
+        pass
+
+    codec = codecs.get('binary')
+    value = [numpy.float64(1.5), Color.RED, {Name('k'): Name('v')}]
+    assert codec.decode(codec.encode(value)) == [1.5, 3, {'k': 'v'}]
+
+
+def test_binary_codec_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        codecs.get('binary').encode([object()])
+
+
+@pytest.mark.skipif('orjson' not in codecs.available(),
+                    reason='orjson is not installed')
+def test_orjson_keeps_nan_and_big_integers():
+    codec = codecs.get('orjson')
+    result = codec.decode(codec.encode([1.5, float('nan'), float('-inf')]))
+    assert math.isnan(result[1]) and result[2] == float('-inf')
+    assert math.isnan(codec.decode(codec.encode(float('nan'))))
+    for value in ([2**70+1, 'a'], [-2**63, 2**64-1]):
+        result = codec.decode(codec.encode(value))
+        assert result == value and type(result[0]) is int
+    result = codec.decode(codecs.get('json').encode([2**70+1]))
+    assert result == [2**70+1] and type(result[0]) is int
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        codecs.get('nonexistent')
+    assert codecs.get('nonexistent', fallback='json').name == 'json'
+    assert codecs.for_tag('json').tag == 'json'
+
+
+@pytest.mark.parametrize('name', codecs.available())
+def test_codec_recorded_in_file(tmp_path, name):
+    filename = str(tmp_path/'test.h5')
+    with h5obj.File(filename, 'w', codec=name) as f:
+        f['x'] = {'a': [1, 'b']}
+        tag = f.h5group['x'].attrs[TAG_ATTR]
+    assert tag == codecs.get(name).tag
+    with h5obj.File(filename, 'r') as f:
+        assert f.codec.name == name
+        assert f['x'] == {'a': [1, 'b']}
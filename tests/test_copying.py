@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test copying, moving and repacking objects without decoding them.
+"""
+
+import h5py
+import numpy
+import pytest
+
+import h5obj
+from h5obj import copying, repack
+from h5obj.tags import TAG_ATTR
+
+
+@pytest.fixture
+def source(tmp_path):
+    filename = str(tmp_path/'source.h5')
+    with h5obj.File(filename, 'w') as f:
+        f['g/arr'] = numpy.arange(1000.)
+        f['g/obj'] = [1, 'a', None]
+        f['cfg'] = {'zeta': 1, 'alpha': {'b': 2, 'a': 1}}
+        f.h5group.create_dataset('g/chunked', data=numpy.arange(1000),
+                                 chunks=(100,), compression='gzip')
+        f.h5group['g'].attrs['unit'] = 'eV'
+        f.h5group['g/soft'] = h5py.SoftLink('/g/arr')
+        f.h5group['g/external'] = h5py.ExternalLink('other.h5', '/x')
+        f.h5group['hard'] = f.h5group['g/arr']
+    return filename
+
+
+def _check(f, prefix=''):
+    numpy.testing.assert_array_equal(f[prefix+'g/arr'], numpy.arange(1000.))
+    assert f[prefix+'g/obj'] == [1, 'a', None]
+    assert f.h5group[prefix+'g/obj'].attrs[TAG_ATTR] == 'json'
+    assert f.h5group[prefix+'g'].attrs['unit'] == 'eV'
+    chunked = f.h5group[prefix+'g/chunked']
+    assert chunked.chunks == (100,) and chunked.compression == 'gzip'
+    numpy.testing.assert_array_equal(chunked[()], numpy.arange(1000))
+    assert f[prefix+'cfg'] == {'zeta': 1, 'alpha': {'b': 2, 'a': 1}}
+    soft = f.h5group.get(prefix+'g/soft', getlink=True)
+    assert isinstance(soft, h5py.SoftLink) and soft.path == '/g/arr'
+    external = f.h5group.get(prefix+'g/external', getlink=True)
+    assert isinstance(external, h5py.ExternalLink)
+    assert (external.filename, external.path) == ('other.h5', '/x')
+
+
+@pytest.mark.parametrize('stream_size', [copying.STREAM_SIZE, 0])
+def test_copy_to_other_file(tmp_path, source, stream_size):
+    dest = str(tmp_path/'dest.h5')
+    with h5py.File(source, 'r') as src, h5py.File(dest, 'w') as dst:
+        for name in ('g', 'cfg'):
+            copying.copy(src[name], dst, name, stream_size=stream_size)
+    with h5obj.File(dest, 'r') as f:
+        _check(f)
+
+
+def test_copy_within_file(source):
+    with h5obj.File(source, 'a') as f:
+        f.copy('g', 'copy/g')
+        f.copy('cfg', 'copy/cfg')
+        _check(f, 'copy/')
+
+
+def test_copy_link(source):
+    with h5py.File(source, 'a') as f:
+        dest = f.create_group('dest')
+        assert copying.copy_link(f['g'], dest, 'soft')
+        assert copying.copy_link(f['g'], dest, 'external')
+        assert not copying.copy_link(f['g'], dest, 'arr')
+        assert sorted(dest) == ['external', 'soft']
+
+
+def test_move(source):
+    with h5obj.File(source, 'a', index=True) as f:
+        oid = f.h5group['g/obj'].id
+        f.move('g/obj', 'moved')
+        assert 'g/obj' not in f
+        assert f['moved'] == [1, 'a', None]
+        assert f.h5group['moved'].id == oid  # relinked, not copied
+
+
+@pytest.mark.parametrize('inplace', [True, False])
+def test_repack(tmp_path, source, inplace):
+    with h5obj.File(source, 'a') as f:
+        f['garbage'] = numpy.zeros(100000)
+        del f['garbage']
+    output = None if inplace else str(tmp_path/'out.h5')
+    report = repack.repack(source, output)
+    assert report.reclaimed > 0
+    with h5obj.File(output or source, 'r') as f:
+        _check(f)
+        assert f.h5group['hard'].id == f.h5group['g/arr'].id
+
+
+def test_repack_with_policy(tmp_path):
+    filename = str(tmp_path/'test.h5')
+    payload = {'key%i' % i: list(range(20)) for i in range(3000)}
+    with h5obj.File(filename, 'w') as f:
+        f['payload'] = payload
+        f['arr'] = numpy.zeros(100000)
+        f['small'] = {'a': 1}
+    report = repack.repack(filename, policy=True)
+    assert report.output_size < report.input_size/10
+    with h5py.File(filename, 'r') as f:
+        assert f['payload'].dtype == numpy.uint8
+        assert f['payload'].compression == 'gzip'
+        assert f['payload'].attrs[TAG_ATTR] == 'json'
+        assert f['arr'].compression == 'gzip'
+    with h5obj.File(filename, 'r') as f:
+        assert f['payload'] == payload
+        assert f['small'] == {'a': 1}
+        numpy.testing.assert_array_equal(f['arr'], numpy.zeros(100000))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test storing and loading objects: storage strategies, type tags and
+decoding of legacy files.
+"""
+
+import h5py
+import numpy
+import pytest
+
+import h5obj
+from h5obj.tags import TAG_ATTR
+
+VALUES = dict(
+    int=1, float=1.5, str='abc', bytes=b'xyz', true=True, none=None,
+    list=[1, 2, 3], floats=[1.0, 2.5], tuple=(1, 2), dict={'a': 1},
+    empty=[], nested=[[1, 2], [3]], strings=['a', 'b'], bools=[True, False],
+    complex=[1+2j, 3j], bigint=[2**70, 1], json_like='[1,2]',
+    npfloat=numpy.float64(2.0), npint=numpy.int32(3),
+    npbool=numpy.bool_(True))
+
+
+@pytest.fixture
+def f(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w') as f:
+        yield f
+
+
+@pytest.mark.parametrize('name', sorted(VALUES))
+def test_roundtrip(f, name):
+    value = VALUES[name]
+    f[name] = value
+    result = f[name]
+    assert result == value
+    assert type(result) is type(value)
+    assert TAG_ATTR in f.h5group[name].attrs
+
+
+def test_mixed_tuple_comes_back_as_list(f):
+    f['x'] = (1, 2.0)
+    assert f['x'] == [1, 2.0]
+
+
+def test_ndarray(f):
+    arr = numpy.arange(12.).reshape(3, 4)
+    f['arr'] = arr
+    assert f.h5group['arr'].attrs[TAG_ATTR] == 'ndarray'
+    numpy.testing.assert_array_equal(f['arr'], arr)
+
+
+def test_homogeneous_lists_are_arrays(f):
+    f['l'] = [1, 2, 3]
+    f['t'] = (1.5, 2.5)
+    assert f.h5group['l'].dtype == numpy.int64
+    assert f.h5group['t'].attrs[TAG_ATTR] == 'tuple'
+
+
+def test_legacy_files(tmp_path):
+    filename = str(tmp_path/'legacy.h5')
+    with h5py.File(filename, 'w') as f:
+        f['json'] = '{"a": [1, 2]}'
+        f['text'] = 'not json'
+        f['arr'] = numpy.arange(3)
+    with h5obj.File(filename, 'r') as f:
+        assert f['json'] == {'a': [1, 2]}
+        assert f['text'] == b'not json'
+        numpy.testing.assert_array_equal(f['arr'], numpy.arange(3))
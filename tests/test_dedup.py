@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test content-addressed deduplication.
+"""
+
+import h5py
+import numpy
+
+import h5obj
+from h5obj import dedup
+
+
+def _nlinks(f, name):
+    return h5py.h5o.get_info(f.h5group[name].id).rc
+
+
+def test_identical_values_are_linked(tmp_path):
+    grid = numpy.arange(10000.)
+    filename = str(tmp_path/'test.h5')
+    with h5obj.File(filename, 'w', dedup=True) as f:
+        f['a'] = grid
+        f['g/b'] = grid
+        f['small1'] = [1, 2]
+        f['small2'] = [1, 2]
+        assert f.h5group['a'].id == f.h5group['g/b'].id
+        assert f.h5group['small1'].id != f.h5group['small2'].id
+        assert sorted(f) == ['a', 'g', 'small1', 'small2']
+        assert len(f) == 4
+    with h5obj.File(filename, 'r') as f:
+        numpy.testing.assert_array_equal(f['g/b'], grid)
+        assert dedup.enabled(f.h5group)
+
+
+def test_refcounting(tmp_path):
+    payload = {'key%i' % i: 'value' for i in range(1000)}
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', dedup=True) as f:
+        f['a'] = payload
+        f['b'] = payload
+        registry = f.h5group[dedup.GROUP]
+        assert len(registry) == 1
+        assert _nlinks(f, 'a') == 3  # a, b and the registry
+        del f['a']
+        assert len(registry) == 1
+        del f['b']
+        assert len(registry) == 0
+        f['g/c'] = payload
+        f['g/d'] = payload
+        del f['g']
+        assert len(registry) == 0
+
+
+def test_copy_links_within_file(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', dedup=True) as f:
+        f['g/x'] = numpy.arange(5)
+        f['g/y'] = {'a': 1}
+        f.copy('g', 'h')
+        assert f.h5group['g/x'].id == f.h5group['h/x'].id
+        assert f['h/y'] == {'a': 1}
+        del f['h/x']
+        numpy.testing.assert_array_equal(f['g/x'], numpy.arange(5))
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test the structural index.
+"""
+
+import h5py
+import numpy
+
+import h5obj
+from h5obj import index
+
+
+def test_index_tracks_datasets(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', index=True) as f:
+        f['a'] = 1
+        f.require_dataset('r', (3,), 'f8')
+        f.create_dataset('c', data=[1, 2])
+        assert 'r' in f and 'c' in f
+        assert sorted(f) == ['a', 'c', 'r']
+        assert f.kind('r') == 'dataset'
+        assert f.index.get('/r').shape == (3,)
+        assert f.index.get('/r').nbytes == 24
+        assert f.index.get('/a').size is None  # variable-length json
+        numpy.testing.assert_array_equal(f['c'], [1, 2])
+
+
+def test_index_lists_names_only(tmp_path):
+    filename = str(tmp_path/'test.h5')
+    with h5py.File(filename, 'w') as f:
+        for i in range(10):
+            f['g/d%i' % i] = i
+    with h5obj.File(filename, 'r', index=True) as f:
+        assert len(f.index.children('/g')) == 10
+        assert f.index.get('/g/d3').kind == 'dataset'
+        assert f.index.get('/g/missing') is None
+
+
+def test_writes_do_not_scan_the_index(tmp_path, monkeypatch):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', index=True) as f:
+        f['g/x'] = 1
+        list(f['g'])
+        calls = []
+        forget = index.Index._forget
+
+        def counting_forget(self, path):
+            calls.append(path)
+            forget(self, path)
+        monkeypatch.setattr(index.Index, '_forget', counting_forget)
+        for i in range(100):
+            f['g/d%i' % i] = i
+        assert calls == []
+        assert len(f['g']) == 101 and f.kind('g/d99') == 'dataset'
+
+
+def test_replaced_group_is_forgotten(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', index=True) as f:
+        f['g/h/x'] = 1
+        assert sorted(f['g']) == ['h'] and f.kind('g/h/x') == 'dataset'
+        del f['g']
+        f['g'] = [1, 2]
+        assert f.kind('g') == 'dataset'
+        assert f.kind('g/h/x') is None
+        assert sorted(f) == ['g']
+
+
+def test_iterentries(tmp_path):
+    filename = str(tmp_path/'test.h5')
+    with h5obj.File(filename, 'w') as f:
+        f['a'] = numpy.arange(10.)
+        f['g/b'] = {'x': 1}
+    with h5py.File(filename, 'r') as f:
+        entries = dict(index.iterentries(f, recursive=True))
+    assert sorted(entries) == ['/a', '/g', '/g/b']
+    assert entries['/a'].nbytes == 80 and entries['/a'].tag == 'ndarray'
+    assert entries['/g'].kind == 'group' and entries['/g/b'].tag == 'json'
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test lazy dataset proxies.
+"""
+
+import numpy
+
+import h5obj
+
+
+def test_lazy_access(tmp_path):
+    filename = str(tmp_path/'test.h5')
+    with h5obj.File(filename, 'w') as f:
+        f['arr'] = numpy.arange(10)
+        f['s'] = 'abc'
+        f['l'] = [1, 2, 3]
+        f.append('series', {'a': 1})
+        f.append('series', {'a': 2})
+    with h5obj.File(filename, 'r', return_value='lazy') as f:
+        lazy = f['arr']
+        assert lazy.shape == (10,)
+        numpy.testing.assert_array_equal(lazy[2:5], [2, 3, 4])
+        numpy.testing.assert_array_equal(numpy.asarray(lazy), numpy.arange(10))
+        assert f['s'][()] == 'abc'
+        assert numpy.asarray(f['s'])[()] == 'abc'
+        assert f['l'][1:] == [2, 3]
+        assert list(numpy.asarray(f['series'])) == [{'a': 1}, {'a': 2}]
+        assert f['series'][1] == {'a': 2}
+
+
+def test_memmap(tmp_path):
+    filename = str(tmp_path/'test.h5')
+    with h5obj.File(filename, 'w') as f:
+        f['arr'] = numpy.arange(100.)
+    with h5obj.File(filename, 'r', return_value='lazy') as f:
+        lazy = f['arr']
+        assert isinstance(lazy.source(), numpy.memmap)
+        part, whole = lazy[:10], lazy[()]
+        assert type(part) is numpy.ndarray and type(whole) is numpy.ndarray
+        with h5obj.File(str(tmp_path/'copy.h5'), 'w') as g:
+            g['part'] = part
+            g['whole'] = whole
+            g['map'] = lazy.source()
+            numpy.testing.assert_array_equal(g['part'], numpy.arange(10.))
+            numpy.testing.assert_array_equal(g['map'], numpy.arange(100.))
+
+
+def test_lazy_mode_off(tmp_path):
+    filename = str(tmp_path/'test.h5')
+    with h5obj.File(filename, 'w') as f:
+        f['arr'] = numpy.arange(3)
+    with h5obj.File(filename, 'r') as f:
+        assert type(f['arr']) is numpy.ndarray
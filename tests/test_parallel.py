@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test loading datasets from many files in parallel.
+"""
+
+import os
+
+import numpy
+import pytest
+
+import h5obj
+from h5obj import parallel, tools
+
+
+@pytest.fixture
+def files(tmp_path):
+    for i in (2, 0, 3, 1):
+        with h5obj.File(str(tmp_path/('p%i.h5' % i)), 'w') as f:
+            f['x'] = i
+            f['g/y'] = [i, 'y']
+            f['big'] = numpy.arange(1000.)*i
+    return str(tmp_path)
+
+
+def test_h5load_jobs(files):
+    pattern = os.path.join(files, 'p*.h5/x')
+    result = tools.h5load(pattern, jobs=2)
+    assert [(os.path.relpath(path, files), value) for path, value in result] \
+        == [('p%i.h5/x' % i, i) for i in range(4)]
+
+
+def test_parallel_load(files):
+    paths = [os.path.join(files, 'p%i.h5/%s' % (i, name))
+             for i in (3, 1) for name in ('g/y', 'x')]
+    assert parallel.load(paths, jobs=2) == [[3, 'y'], 3, [1, 'y'], 1]
+    values = parallel.load(paths[:1], jobs=1, shm_threshold=0)
+    assert values == [[3, 'y']]
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_parallel_load_shared_memory(files, jobs):
+    paths = [os.path.join(files, 'p%i.h5/big' % i) for i in range(4)]
+    values = parallel.load(paths, jobs=jobs, shm_threshold=1000)
+    for i, value in enumerate(values):
+        assert type(value) is numpy.ndarray
+        numpy.testing.assert_array_equal(value, numpy.arange(1000.)*i)
+
+
+def _segments():
+    return set(name for name in os.listdir('/dev/shm')
+               if name.startswith('psm_'))
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason='no /dev/shm')
+def test_parallel_load_failure_releases_shared_memory(files):
+    before = _segments()
+    paths = [os.path.join(files, 'p%i.h5/%s' % (i, name))
+             for i in (1, 2) for name in ('big', 'missing', 'big')]
+    with pytest.raises(KeyError):
+        parallel.load(paths, jobs=2, shm_threshold=1000)
+    with pytest.raises(KeyError):
+        parallel._load_file(paths[0].split('.h5/')[0]+'.h5',
+                            ['big', 'missing'], shm_threshold=1000)
+    assert _segments() <= before
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test the storage policy for chunking and compression.
+"""
+
+import numpy
+
+import h5obj
+from h5obj.policy import StoragePolicy
+from h5obj.tags import TAG_ATTR
+
+
+def test_large_arrays_are_compressed(tmp_path):
+    policy = StoragePolicy(compression='gzip', min_size=1024,
+                           chunk_size=8*1024)
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', policy=policy) as f:
+        f['large'] = numpy.zeros((100, 100))
+        f['small'] = numpy.zeros(10)
+        large = f.h5group['large']
+        assert large.compression == 'gzip' and large.shuffle
+        assert numpy.prod(large.chunks)*8 <= 8*1024
+        assert f.h5group['small'].chunks is None
+        numpy.testing.assert_array_equal(f['large'], numpy.zeros((100, 100)))
+
+
+def test_large_payloads_are_byte_arrays(tmp_path):
+    payload = {'key%i' % i: 'value' for i in range(100)}
+    policy = StoragePolicy(payload_size=100)
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', policy=policy) as f:
+        f['payload'] = payload
+        f['small'] = 'x'
+        dset = f.h5group['payload']
+        assert dset.dtype == numpy.uint8 and dset.attrs[TAG_ATTR] == 'json'
+        assert f.h5group['small'].dtype.kind == 'O'
+        assert f['payload'] == payload and f['small'] == 'x'
+
+
+def test_chunk_shape():
+    policy = StoragePolicy(chunk_size=1024)
+    chunks = policy.chunk_shape((1000, 10), 8)
+    assert numpy.prod(chunks)*8 <= 1024 and chunks[1] == 10
+    assert policy.storage_kwargs((10,), 'f8') == {}
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test appendable series.
+"""
+
+import numpy
+import pytest
+
+import h5obj
+
+
+@pytest.fixture
+def f(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', libver='latest') as f:
+        yield f
+
+
+def test_numeric_series(f):
+    for i in range(5):
+        f.append('energy', 0.5*i)
+        f.append('g/vec', numpy.arange(3)*i)
+    f.extend('energy', [10, 11])
+    f.extend('empty', [])
+    numpy.testing.assert_array_equal(f['energy'], [0, .5, 1, 1.5, 2, 10, 11])
+    assert f['g/vec'].shape == (5, 3)
+    assert 'empty' not in f
+
+
+def test_object_series(f):
+    records = [{'step': i, 'msg': 'x'*i} for i in range(5)]
+    for record in records:
+        f.append('log', record)
+    assert f['log'] == records
+    assert f.get_many(['log'])[0] == records
+
+
+def test_binary_series(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', codec='binary') as f:
+        f.append('bin', b'\x00\x01')
+        f.append('bin', (1, 2, None))
+        assert f['bin'] == [b'\x00\x01', (1, 2, None)]
+
+
+def test_incompatible_records(f):
+    f.append('energy', 1.0)
+    with pytest.raises((TypeError, ValueError)):
+        f.append('energy', 'abc')
+    with pytest.raises((TypeError, ValueError)):
+        f.append('energy', [1, 2])
+    f['plain'] = [1, 'a']
+    with pytest.raises(TypeError):
+        f.append('plain', 1)
+
+
+def test_lazy_series(tmp_path):
+    filename = str(tmp_path/'test.h5')
+    with h5obj.File(filename, 'w') as f:
+        f.extend('log', [{'i': i} for i in range(4)])
+    with h5obj.File(filename, 'r', return_value='lazy') as f:
+        log = f['log']
+        assert len(log) == 4
+        assert log[2] == {'i': 2}
+        assert log[1:3] == [{'i': 1}, {'i': 2}]
+
+
+def test_swmr(tmp_path):
+    filename = str(tmp_path/'test.h5')
+    with h5obj.File(filename, 'w', libver='latest') as writer:
+        writer.append('energy', 1.0)
+        writer.swmr_mode = True
+        with h5obj.File(filename, 'r', swmr=True) as reader:
+            assert list(reader['energy']) == [1.0]
+            writer.append('energy', 2.0)
+            writer.flush()
+            assert list(reader['energy']) == [1.0, 2.0]
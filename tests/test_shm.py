@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test shared-memory snapshots.
+"""
+
+import concurrent.futures
+import os
+
+import numpy
+import pytest
+
+import h5obj
+from h5obj import shm
+
+
+@pytest.fixture
+def filename(tmp_path):
+    filename = str(tmp_path/'test.h5')
+    with h5obj.File(filename, 'w', tree=True) as f:
+        f['results/energy'] = numpy.arange(100.)
+        f['results/meta'] = {'run': 42, 'tags': ['a', 'b']}
+        f['results/sub/n'] = 3
+        f['other'] = 1
+    return filename
+
+
+def test_snapshot(filename):
+    with shm.create(filename, 'results') as snapshot:
+        results = shm.attach(snapshot.name)
+        try:
+            energy = results['energy']
+            numpy.testing.assert_array_equal(energy, numpy.arange(100.))
+            assert not energy.flags.writeable
+            assert results['meta'] == {'run': 42, 'tags': ['a', 'b']}
+            assert results['sub/n'] == 3
+            assert sorted(results) == ['energy', 'meta', 'sub']
+            assert results.kind('sub') == 'group'
+            assert 'other' not in results
+            del energy
+        finally:
+            results.close()
+
+
+def test_snapshot_of_dataset(filename):
+    with h5obj.File(filename, 'r') as f:
+        with pytest.raises(TypeError):
+            shm.create(f, 'other')
+
+
+def _energy_sum(name):
+    with shm.attach(name) as results:
+        return float(results['energy'].sum())
+
+
+def test_snapshot_in_workers(filename):
+    snapshot = shm.create(filename, 'results')
+    try:
+        with concurrent.futures.ProcessPoolExecutor(2) as pool:
+            sums = list(pool.map(_energy_sum, [snapshot.name]*4))
+        assert sums == [4950.0]*4
+    finally:
+        snapshot.unlink()
+    if os.path.isdir('/dev/shm'):
+        assert snapshot.name.lstrip('/') not in os.listdir('/dev/shm')
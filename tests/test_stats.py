@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test the statistics of h5obj files.
+"""
+
+import h5py
+import numpy
+
+import h5obj
+from h5obj import stats
+
+
+def test_stats(tmp_path):
+    events = []
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', stats=True) as f:
+        with f.stats.hook(events.append):
+            f['x'] = {'a': 1}
+        f['x']
+        assert f.stats.counts['encode'] == 1
+        assert f.stats.counts['write'] == 1
+        assert f.stats.counts['read'] == 1
+        assert f.stats.counts['decode'] == 1
+        assert f.stats.bytes_written == f.stats.bytes_read > 0
+    assert [event.op for event in events] == ['encode', 'write']
+    assert events[1].path == '/x'
+
+
+def test_stats_of_arrays_and_legacy_datasets(tmp_path):
+    filename = str(tmp_path/'test.h5')
+    with h5py.File(filename, 'w') as f:
+        f['legacy'] = '[1, 2]'
+    with h5obj.File(filename, 'a', stats=stats.Stats()) as f:
+        f['arr'] = numpy.zeros(100)
+        f['arr']
+        assert f.stats.bytes_read == 800
+        assert f.stats.counts['encode'] == 0
+        assert f['legacy'] == [1, 2]
+        assert f.stats.counts['legacy'] == 1
+        f.stats.reset()
+        assert not f.stats.counts and f.stats.bytes_read == 0
+
+
+def test_stats_disabled_by_default(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w') as f:
+        f['x'] = 1
+        assert f.stats is None
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test the tools (called as functions, so comliner is not needed).
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+
+import numpy
+import pytest
+
+import h5obj
+from h5obj import tools
+
+
+@pytest.fixture
+def files(tmp_path):
+    filenames = []
+    for i in (2, 0, 3, 1):
+        filename = str(tmp_path/('p%i.h5' % i))
+        with h5obj.File(filename, 'w') as f:
+            f['x'] = i
+            f['g/y'] = [i, 'y']
+            f['g/h/z'] = numpy.arange(i+1)
+        filenames.append(filename)
+    return str(tmp_path)
+
+
+def test_h5ls(files):
+    filename = os.path.join(files, 'p0.h5')
+    assert tools.h5ls(filename) == ['g', 'x']
+    assert tools.h5ls(filename+'/g') == ['h', 'y']
+    assert tools.h5ls(filename+'/x') == ['x']
+
+
+def test_h5mkgrp_h5rmgrp_h5rm(files):
+    filename = os.path.join(files, 'p0.h5')
+    tools.h5mkgrp(filename+'/empty')
+    assert 'empty' in tools.h5ls(filename)
+    tools.h5rmgrp(filename+'/empty')
+    with pytest.raises(SystemExit):
+        tools.h5rmgrp(filename+'/g')
+    tools.h5rm(filename+'/x', force=True)
+    assert tools.h5ls(filename) == ['g']
+
+
+def test_h5ls_recursive(files, capsys):
+    assert tools.h5ls(os.path.join(files, 'p1.h5'), recursive=True) is None
+    assert capsys.readouterr().out.split() == ['g', 'x', 'g/h', 'g/y',
+                                               'g/h/z']
+    tools.h5ls(os.path.join(files, 'p1.h5/g'), recursive=True)
+    assert capsys.readouterr().out.split() == ['h', 'y', 'h/z']
+
+
+def test_h5ll(tmp_path, capsys):
+    filename = str(tmp_path/'test.h5')
+    with h5obj.File(filename, 'w') as f:
+        f['arr'] = numpy.arange(1000.)
+        f['obj'] = {'k%i' % i: 'v'*100 for i in range(1000)}
+        f['g/x'] = 1
+    tools.h5ll(filename)
+    lines = [line.split() for line in capsys.readouterr().out.splitlines()]
+    assert lines == [
+        ['dataset', 'ndarray', 'float64', '1000', '7.8', 'KiB', '1.0', '-',
+         '-', 'arr'],
+        ['group', '-', '-', '-', '-', '-', '-', '-', 'g'],
+        # the size of variable-length data is not known without reading it
+        ['dataset', 'json', 'object', 'scalar', 'vlen', '-', '-', '-',
+         'obj']]
+    tools.h5ls(filename+'/g', long=True)
+    assert capsys.readouterr().out.split()[-1] == 'x'
+    tools.h5ll(filename+'/arr')
+    assert capsys.readouterr().out.split()[-1] == 'arr'
+    tools.h5ll(filename, recursive=True)
+    names = [line.split()[-1] for line in capsys.readouterr().out.splitlines()]
+    assert names == ['arr', 'g', 'obj', 'g/x']
+    with pytest.raises(SystemExit):
+        tools.h5ll(filename+'/missing')
+
+
+def test_h5complete(files, tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path/'cache'))
+    filename = os.path.join(files, 'p1.h5')
+    assert tools.h5complete(os.path.join(files, 'p1')) == [filename+'/']
+    assert tools.h5complete(filename+'/') == [filename+'/g/', filename+'/x']
+    assert tools.h5complete(filename+'/g/h') == [filename+'/g/h/']
+    assert tools.h5complete(filename+'/missing/') == []
+    assert os.path.isfile(tools._completion_cache_file(filename))
+
+    # repeated completions are served from the cache
+    def fail(filename, grpname):
+        raise AssertionError('file opened')
+    monkeypatch.setattr(tools, '_list_members', fail)
+    assert tools.h5complete(filename+'/g/') == [filename+'/g/h/',
+                                               filename+'/g/y']
+    monkeypatch.undo()
+
+    # the cache is discarded when the file changes
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path/'cache'))
+    with h5obj.File(filename, 'a') as f:
+        f['g/new'] = 1
+    assert tools.h5complete(filename+'/g/n') == [filename+'/g/new']
+
+
+def test_main(monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['h5obj'])
+    assert tools.main() == 2
+    assert 'h5load' in capsys.readouterr().err
+    monkeypatch.setattr(sys, 'argv', ['h5obj', 'bogus'])
+    assert tools.main() == 2
+    assert 'unknown command "bogus"' in capsys.readouterr().err
+    monkeypatch.setitem(sys.modules, 'comliner', None)  # not importable
+    monkeypatch.setattr(sys, 'argv', ['/usr/bin/h5obj', 'll', 'test.h5'])
+    assert tools.main() == 1
+    error = capsys.readouterr().err
+    assert error.startswith('h5ll: ') and 'comliner' in error
+    assert 'None in sys.modules' in error  # the original error
+
+
+def test_import_is_lazy():
+    code = ('import sys, types, h5obj.tools\n'
+            'print(*[name for name in ("h5py", "numpy", "orjson", "comliner")'
+            ' if type(sys.modules.get(name)) is types.ModuleType])')
+    proc = subprocess.run([sys.executable, '-c', code], check=True,
+                          stdout=subprocess.PIPE, text=True,
+                          env=dict(os.environ, PYTHONPATH=os.pathsep.join(
+                              sys.path)))
+    assert proc.stdout.split() == []
+
+
+def test_h5glob(files):
+    paths = tools.h5glob(os.path.join(files, 'p*.h5/**/z'), sort=True)
+    assert [os.path.relpath(path, files) for path in paths] \
+        == ['p%i.h5/g/h/z' % i for i in range(4)]
+    patterns = tools.h5glob_filewise(os.path.join(files, 'p*.h5/g/*'))
+    assert [os.path.relpath(pattern, files) for pattern in patterns] \
+        == ['p%i.h5/g/*' % i for i in range(4)]
+
+
+def test_h5iglob_streams(files):
+    matches = tools.h5iglob(os.path.join(files, 'p0.h5/**'))
+    first = next(matches)
+    assert first.startswith(os.path.join(files, 'p0.h5/'))
+    matches.close()
+
+
+def test_h5split(files):
+    filename = os.path.join(files, 'p0.h5')
+    assert tools.h5split(filename+'/g/y') == (filename, 'g/y')
+    assert tools.h5split_many([filename+'/x', filename]) \
+        == [(filename, 'x'), (filename, '')]
+
+
+def test_h5split_nested_directories(tmp_path):
+    directory = tmp_path/'a.h5'/'b'
+    directory.mkdir(parents=True)
+    filename = str(directory/'c.h5')
+    with h5obj.File(filename, 'w') as f:
+        f['x/y'] = 1
+    assert tools.h5split(filename+'/x/y') == (filename, 'x/y')
+    tools.h5split_cache_clear()
+    assert tools.h5split(filename+'/x') == (filename, 'x')
+
+
+def test_h5cp_h5mv(files):
+    source = os.path.join(files, 'p1.h5')
+    dest = os.path.join(files, 'copy.h5')
+    tools.h5cp(source+'/g', dest+'/g', recursive=True)
+    tools.h5mv(dest+'/g/y', dest+'/y')
+    with h5obj.File(dest, 'r') as f:
+        assert f['y'] == [1, 'y']
+        assert 'g/y' not in f
+        numpy.testing.assert_array_equal(f['g/h/z'], [0, 1])
+
+
+def test_h5repack(files, capsys):
+    filename = os.path.join(files, 'p1.h5')
+    with h5obj.File(filename, 'a') as f:
+        f['big'] = numpy.arange(100000)
+        f['garbage'] = numpy.zeros(100000)
+        del f['garbage']
+    output = os.path.join(files, 'packed.h5')
+    tools.h5repack(filename, output=output, compression='gzip')
+    assert capsys.readouterr().out.startswith(output+': ')
+    assert os.path.getsize(output) < os.path.getsize(filename)
+    with h5obj.File(output, 'r') as f:
+        assert f.h5group['big'].compression == 'gzip'
+        assert f.h5group['g/h/z'].compression is None  # too small
+        assert f['g/y'] == [1, 'y']
+    with pytest.raises(SystemExit):
+        tools.h5repack(filename, compression='bogus')
+    assert 'h5repack: ' in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        tools.h5repack(os.path.join(files, 'missing.h5'))
+
+
+def test_h5save_h5load(files):
+    filename = os.path.join(files, 'new.h5')
+    tools.h5save(filename+'/a/b', data={'k': [1, 2]})
+    assert tools.h5load(filename+'/a/b') == {'k': [1, 2]}
+    with pytest.raises(SystemExit):
+        tools.h5save(filename+'/a/b', data=1)
+    tools.h5save(filename+'/a/b', data=1, force=True)
+    assert tools.h5load(filename+'/a/b', dtype=True) is int
+
+
+def test_parse_value():
+    assert tools._parse_value('[1, 2]') == [1, 2]
+    assert tools._parse_value('(1, 2j)') == (1, 2j)
+    assert tools._parse_value('__import__("os")') == '__import__("os")'
+
+
+def test_ndjson(files, tmp_path):
+    output = io.StringIO()
+    count = tools.h5load_ndjson([os.path.join(files, 'p*.h5/g/y')], output)
+    assert count == 4
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [line['value'] for line in lines] == [[i, 'y'] for i in range(4)]
+    filename = str(tmp_path/'ndjson.h5')
+    lines = ['{"path": "a", "value": [1, 2]}\n', '\n',
+             '{"path": "g/b", "value": {"c": null}}\n']
+    assert tools.h5save_ndjson(lines, filename=filename) == 2
+    with h5obj.File(filename, 'r') as f:
+        assert f['a'] == [1, 2] and f['g/b'] == {'c': None}
+    with pytest.raises(SystemExit):
+        tools.h5save_ndjson(lines[:1], filename=filename)  # exists
+    assert tools.h5save_ndjson(lines[:1], force=True, filename=filename) == 1
+    with pytest.raises(SystemExit):
+        tools.h5save_ndjson(['{"value": 1}'], filename=filename)
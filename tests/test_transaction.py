@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test write-buffered transactions.
+"""
+
+import pytest
+
+import h5obj
+
+
+@pytest.fixture
+def f(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w') as f:
+        yield f
+
+
+def test_commit(f):
+    f['old'] = 1
+    with f.transaction() as t:
+        t['a'] = {'x': 1}
+        t['g/b'] = [1, 2]
+        t['old'] = 2
+        del t['a']
+        t.create_group('empty')
+        assert 'a' not in t and 'old' in t
+        assert t['g/b'] == [1, 2]
+        assert 'g/b' not in f
+    assert f['g/b'] == [1, 2] and f['old'] == 2
+    assert 'a' not in f and 'empty' in f
+
+
+def test_discard_on_error(f):
+    f['a'] = 1
+    with pytest.raises(RuntimeError):
+        with f.transaction() as t:
+            t['a'] = 2
+            t['b'] = 3
+            raise RuntimeError
+    assert f['a'] == 1 and 'b' not in f
+
+
+def test_unencodable_object_fails_at_assignment(f):
+    with f.transaction() as t:
+        with pytest.raises(TypeError):
+            t['a'] = object()
+    assert 'a' not in f
+
+
+def test_write_below_pending_dataset(f):
+    with pytest.raises(TypeError):
+        with f.transaction() as t:
+            t['d'] = 1
+            t['d/e'] = 2
+    assert 'd' not in f
+
+
+def test_write_below_existing_dataset(f):
+    f['x'] = 1
+    with f.transaction() as t:
+        with pytest.raises(TypeError):
+            t['x/y'] = 2
+        with pytest.raises(TypeError):
+            t.create_group('x/g')
+    assert f['x'] == 1
+
+
+def test_replace_dataset_by_group(f):
+    f['x'] = 1
+    with f.transaction() as t:
+        del t['x']
+        t['x/y'] = 3
+    assert f['x/y'] == 3
+    with f.transaction() as t:
+        t['d/e'] = 2
+        t['d'] = 1
+    assert f['d'] == 1
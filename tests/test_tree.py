@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright notice
+# ----------------
+#
+# Copyright (C) 2013-2023 Daniel Jung
+# Contact: proggy-contact@mailbox.org
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation; either version 2 of the License, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+#
+"""Test storing dictionaries as trees of groups.
+"""
+
+import pytest
+
+import h5obj
+from h5obj import repack
+from h5obj.tags import TAG_ATTR
+
+CONFIG = {'solver': {'tol': 1e-3, 'n': 5, 'name': 'cg'}, 'zeta': 1,
+          'alpha': [1, 2], 'mid': {'x': None}}
+
+
+@pytest.fixture
+def f(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w', tree=True) as f:
+        f['cfg'] = CONFIG
+        yield f
+
+
+def test_roundtrip_keeps_order(f):
+    result = f['cfg']
+    assert result == CONFIG
+    assert list(result) == list(CONFIG)
+    assert list(result['solver']) == list(CONFIG['solver'])
+    assert f.h5group['cfg'].attrs[TAG_ATTR] == 'dict'
+
+
+def test_single_members(f):
+    assert f['cfg/solver/tol'] == 1e-3
+    assert f.get_many(['cfg/zeta', 'cfg/solver/name']) == [1, 'cg']
+
+
+def test_replace_member_keeps_position(f):
+    f['cfg/solver/tol'] = 1e-6
+    f['cfg/zeta'] = {'new': True}
+    result = f['cfg']
+    assert list(result) == list(CONFIG)
+    assert list(result['solver']) == list(CONFIG['solver'])
+    assert result['solver']['tol'] == 1e-6
+    assert result['zeta'] == {'new': True}
+
+
+def test_set_many_replaces_members(f):
+    f.set_many({'cfg/solver/n': 7, 'cfg/alpha': 'a'})
+    result = f['cfg']
+    assert list(result) == list(CONFIG)
+    assert result['solver']['n'] == 7 and result['alpha'] == 'a'
+
+
+def test_keys_that_are_no_names(f):
+    value = {'': 'a', 'b/c': 2}
+    f['other'] = value
+    assert f['other'] == value
+    assert f.h5group['other'].attrs[TAG_ATTR] == 'json'
+
+
+def test_tree_mode_off(tmp_path):
+    with h5obj.File(str(tmp_path/'test.h5'), 'w') as f:
+        f['cfg'] = CONFIG
+        assert f.h5group['cfg'].attrs[TAG_ATTR] == 'json'
+        assert f['cfg'] == CONFIG
+
+
+def test_copy_and_repack_keep_order(tmp_path):
+    filename = str(tmp_path/'test.h5')
+    with h5obj.File(filename, 'w', tree=True) as f:
+        f['cfg'] = CONFIG
+        f.copy('cfg', 'copy')
+    repack.repack(filename)
+    with h5obj.File(filename, 'r') as f:
+        for name in ('cfg', 'copy'):
+            result = f[name]
+            assert result == CONFIG
+            assert list(result) == list(CONFIG)
+            assert list(result['solver']) == list(CONFIG['solver'])